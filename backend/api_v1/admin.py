@@ -1,53 +1,166 @@
 from django.contrib import admin
+from django.db.models import Q
+from django.utils import timezone
 
-from .models import CustomUser, Ingredient, IngredientInRecipe, FavoriteRecipe, \
-    Follow, Recipe, ShoppingCart, Tag, TagsInRecipe
+from .models import (CustomUser, FavoriteRecipe, FeedItem, Follow,
+                     ImageVariantsStatus, Ingredient, IngredientInRecipe,
+                     Recipe, ShoppingCart, ShoppingListItem, SimilarRecipe,
+                     Tag, TagsInRecipe)
+
+
+class PrefixSearchMixin:
+    def get_search_results(self, request, queryset, search_term):
+        search_term = ' '.join(search_term.split())
+        if not search_term:
+            return queryset, False
+        query = Q()
+        for field in self.search_fields:
+            query |= Q(**{field.lstrip('^') + '__istartswith': search_term})
+        return queryset.filter(query), False
+
+
+class TouchRecipeMixin:
+    def touch_recipes(self, recipe_ids):
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            updated_at=timezone.now())
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        recipe_ids = {obj.recipe_id, form.initial.get('recipe')}
+        recipe_ids.discard(None)
+        self.touch_recipes(recipe_ids)
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.touch_recipes([obj.recipe_id])
+
+    def delete_queryset(self, request, queryset):
+        recipe_ids = list(queryset.values_list('recipe_id', flat=True))
+        super().delete_queryset(request, queryset)
+        self.touch_recipes(recipe_ids)
 
 
 @admin.register(CustomUser)
-class UserAdmin(admin.ModelAdmin):
-    list_filter = ('username', 'email')
+class UserAdmin(PrefixSearchMixin, admin.ModelAdmin):
+    list_display = ('username', 'email', 'first_name', 'last_name',
+                    'recipes_count', 'followers_count')
+    search_fields = ('^username', '^email')
+    show_full_result_count = False
 
 
 @admin.register(Tag)
 class TagAdmin(admin.ModelAdmin):
-    pass
+    list_display = ('name', 'slug', 'color')
+    search_fields = ('name', 'slug')
+
+
+class IngredientInRecipeInline(admin.TabularInline):
+    model = IngredientInRecipe
+    autocomplete_fields = ('ingredient',)
+    extra = 0
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient',
+                                                            'recipe')
+
+
+class TagsInRecipeInline(admin.TabularInline):
+    model = TagsInRecipe
+    autocomplete_fields = ('tag',)
+    extra = 0
 
 
 @admin.register(Recipe)
-class RecipeAdmin(admin.ModelAdmin):
-    list_filter = ('name', 'author', 'tags')
-    list_display = ('name', 'is_favorited', )
+class RecipeAdmin(PrefixSearchMixin, admin.ModelAdmin):
+    list_filter = ('tags__tag',)
+    list_display = ('name', 'author', 'pub_date', 'is_favorited',
+                    'in_carts_count')
+    list_select_related = ('author',)
+    search_fields = ('^name',)
+    autocomplete_fields = ('author',)
+    readonly_fields = ('favorites_count', 'in_carts_count',
+                       'image_variants_status')
+    inlines = (IngredientInRecipeInline, TagsInRecipeInline)
+    show_full_result_count = False
+
+    def save_model(self, request, obj, form, change):
+        if 'image' in form.changed_data:
+            obj.image_variants_status = ImageVariantsStatus.PENDING
+        super().save_model(request, obj, form, change)
 
     def is_favorited(self, obj):
-        return obj.is_favorited.all().count()
+        return obj.favorites_count
+    is_favorited.admin_order_field = 'favorites_count'
 
 
 @admin.register(Ingredient)
-class IngredientAdmin(admin.ModelAdmin):
-    list_filter = ('name', )
+class IngredientAdmin(PrefixSearchMixin, admin.ModelAdmin):
+    list_display = ('name', 'measurement_unit')
+    list_filter = ('measurement_unit', )
+    search_fields = ('^name', )
+    ordering = ('name', )
+    show_full_result_count = False
 
 
 @admin.register(IngredientInRecipe)
-class IngredientInRecipeAdmin(admin.ModelAdmin):
-    pass
+class IngredientInRecipeAdmin(TouchRecipeMixin, admin.ModelAdmin):
+    list_display = ('recipe', 'ingredient', 'amount')
+    list_select_related = ('recipe', 'ingredient')
+    autocomplete_fields = ('recipe', 'ingredient')
+    show_full_result_count = False
 
 
 @admin.register(TagsInRecipe)
-class TagsInRecipeAdmin(admin.ModelAdmin):
-    pass
+class TagsInRecipeAdmin(TouchRecipeMixin, admin.ModelAdmin):
+    list_display = ('recipe', 'tag')
+    list_select_related = ('recipe', 'tag')
+    autocomplete_fields = ('recipe', 'tag')
+    show_full_result_count = False
 
 
 @admin.register(FavoriteRecipe)
 class FavoriteRecipeAdmin(admin.ModelAdmin):
-    pass
+    list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
 
 
 @admin.register(Follow)
 class FollowAdmin(admin.ModelAdmin):
-    pass
+    list_display = ('user', 'following')
+    list_select_related = ('user', 'following')
+    autocomplete_fields = ('user', 'following')
+    show_full_result_count = False
 
 
 @admin.register(ShoppingCart)
 class ShoppingCartAdmin(admin.ModelAdmin):
-    pass
+    list_display = ('user', 'recipe')
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
+
+
+@admin.register(ShoppingListItem)
+class ShoppingListItemAdmin(admin.ModelAdmin):
+    list_display = ('user', 'ingredient', 'amount')
+    list_select_related = ('user', 'ingredient')
+    autocomplete_fields = ('user', 'ingredient')
+    show_full_result_count = False
+
+
+@admin.register(SimilarRecipe)
+class SimilarRecipeAdmin(admin.ModelAdmin):
+    list_display = ('recipe', 'similar', 'score')
+    list_select_related = ('recipe', 'similar')
+    autocomplete_fields = ('recipe', 'similar')
+    show_full_result_count = False
+
+
+@admin.register(FeedItem)
+class FeedItemAdmin(admin.ModelAdmin):
+    list_display = ('user', 'recipe', 'pub_date')
+    list_select_related = ('user', 'recipe')
+    autocomplete_fields = ('user', 'recipe')
+    show_full_result_count = False
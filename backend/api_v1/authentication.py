@@ -0,0 +1,46 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from .caching import is_cache_shared
+
+INVALIDATED = 'invalidated'
+INVALIDATION_TIMEOUT = 30
+
+
+def get_cache_key(key):
+    return 'auth-token:{0}'.format(
+        hashlib.sha256(key.encode('utf-8')).hexdigest())
+
+
+def get_timeout():
+    # Отзыв токена сбрасывает кэш только того процесса, где он случился.
+    # Без общего кэша остальные воркеры узнают о нём по истечении срока.
+    if is_cache_shared():
+        return settings.AUTH_TOKEN_CACHE_TIMEOUT
+    return settings.AUTH_TOKEN_LOCAL_CACHE_TIMEOUT
+
+
+def invalidate_token(key):
+    cache.set(get_cache_key(key), INVALIDATED, INVALIDATION_TIMEOUT)
+
+
+def invalidate_user(user_id):
+    for key in Token.objects.filter(user_id=user_id).values_list(
+            'key', flat=True):
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    def authenticate_credentials(self, key):
+        cache_key = get_cache_key(key)
+        cached = cache.get(cache_key)
+        if cached is not None and cached != INVALIDATED:
+            return cached
+        credentials = super().authenticate_credentials(key)
+        if cached is None:
+            cache.add(cache_key, credentials, get_timeout())
+        return credentials
@@ -0,0 +1,130 @@
+import threading
+import time
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db.models import Count, Max
+
+from .caching import INGREDIENTS, get_generation
+from .models import Ingredient
+
+LATIN_LAYOUT = '`qwertyuiop[]asdfghjkl;\'zxcvbnm,.'
+CYRILLIC_LAYOUT = 'ёйцукенгшщзхъфывапролджэячсмитьбю'
+TO_CYRILLIC = str.maketrans(LATIN_LAYOUT, CYRILLIC_LAYOUT)
+TO_LATIN = str.maketrans(CYRILLIC_LAYOUT, LATIN_LAYOUT)
+
+
+def normalize(value):
+    return ' '.join(value.lower().replace('ё', 'е').split())
+
+
+def switch_layout(value):
+    if any(char in CYRILLIC_LAYOUT for char in value):
+        return value.translate(TO_LATIN)
+    return value.translate(TO_CYRILLIC)
+
+
+class IngredientIndex:
+    def __init__(self, ingredients):
+        self.entries = sorted(
+            (normalize(name), pk, name, measurement_unit)
+            for pk, name, measurement_unit in ingredients
+        )
+        names = [entry[0] for entry in self.entries]
+        words = []
+        suffixes = []
+        for position, key in enumerate(names):
+            for start in range(1, len(key)):
+                if key[start - 1] == ' ':
+                    words.append((key[start:], position))
+                else:
+                    suffixes.append((key[start:], position))
+        words.sort()
+        suffixes.sort()
+        # Порядок уровней задаёт ранжирование: начало названия, начало
+        # слова в названии, любая подстрока.
+        self.tiers = [
+            (names, range(len(names))),
+            ([key for key, _ in words], [position for _, position in words]),
+            ([key for key, _ in suffixes],
+             [position for _, position in suffixes]),
+        ]
+
+    @classmethod
+    def from_db(cls):
+        return cls(Ingredient.objects.values_list(
+            'id', 'name', 'measurement_unit').iterator())
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _match(self, query, limit):
+        found = {}
+        for keys, positions in self.tiers:
+            for offset in range(bisect_left(keys, query), len(keys)):
+                if len(found) >= limit or not keys[offset].startswith(query):
+                    break
+                found.setdefault(positions[offset], None)
+        return list(found)
+
+    def search(self, query, limit=10):
+        query = normalize(query)
+        if not query or limit < 1:
+            return []
+        positions = self._match(query, limit)
+        if not positions:
+            positions = self._match(switch_layout(query), limit)
+        return [
+            {
+                'id': self.entries[position][1],
+                'name': self.entries[position][2],
+                'measurement_unit': self.entries[position][3],
+            }
+            for position in positions
+        ]
+
+
+_index = None
+_index_version = None
+_index_built = 0
+_index_checked = 0
+_lock = threading.Lock()
+
+
+def get_version(generation):
+    # Поколение в кэше видно только своему процессу, поэтому к нему
+    # добавляется состояние таблицы: вставки и удаления из других
+    # процессов меняют количество или максимальный id.
+    stats = Ingredient.objects.aggregate(count=Count('id'), last=Max('id'))
+    return generation, stats['count'], stats['last']
+
+
+def is_checked(generation):
+    # Таблица сверяется не чаще раза в INGREDIENT_INDEX_CHECK_SECONDS.
+    return (_index is not None and _index_version[0] == generation
+            and time.monotonic() - _index_checked
+            < settings.INGREDIENT_INDEX_CHECK_SECONDS)
+
+
+def is_stale(version):
+    # Правка названия в другом процессе не меняет версию, такие изменения
+    # подхватываются по истечении срока жизни индекса.
+    return (_index is None or _index_version != version
+            or time.monotonic() - _index_built
+            > settings.INGREDIENT_INDEX_TIMEOUT)
+
+
+def get_index():
+    global _index, _index_version, _index_built, _index_checked
+    generation = get_generation(INGREDIENTS)
+    if is_checked(generation):
+        return _index
+    version = get_version(generation)
+    if is_stale(version):
+        with _lock:
+            if is_stale(version):
+                _index = IngredientIndex.from_db()
+                _index_version = version
+                _index_built = time.monotonic()
+    _index_checked = time.monotonic()
+    return _index
@@ -0,0 +1,100 @@
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+RECIPES = 'recipes'
+INGREDIENTS = 'ingredients'
+CATALOG = 'catalog'
+
+
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def is_cache_shared():
+    return settings.CACHES['default']['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+def generation_key(name):
+    return 'generation:{0}'.format(name)
+
+
+def get_generation(name):
+    return cache.get_or_set(generation_key(name), 1, None)
+
+
+def bump_generation(name):
+    try:
+        cache.incr(generation_key(name))
+    except ValueError:
+        cache.set(generation_key(name), 1, None)
+
+
+def bump_generation_on_commit(name):
+    transaction.on_commit(lambda: bump_generation(name))
+
+
+class ResponseCache:
+    def __init__(self, name, generation):
+        self.name = name
+        self.generation = generation
+
+    def get_key(self, request):
+        params = sorted(
+            (key, value)
+            for key in request.query_params
+            for value in sorted(request.query_params.getlist(key))
+        )
+        digest = hashlib.md5('{0}?{1}'.format(
+            request.get_host(), urlencode(params)).encode('utf-8'))
+        return 'response:{0}:{1}:{2}'.format(
+            self.name, get_generation(self.generation), digest.hexdigest())
+
+    def get(self, request):
+        start = time.perf_counter()
+        key = self.get_key(request)
+        data = cache.get(key)
+        if data is not None:
+            self.record('hits', start)
+        return key, data
+
+    def set(self, key, data, start):
+        cache.set(key, data, settings.RECIPES_LIST_CACHE_TIMEOUT)
+        self.record('misses', start)
+
+    def record(self, outcome, start):
+        elapsed = int((time.perf_counter() - start) * 1000000)
+        for suffix, value in ((outcome, 1), (outcome + '_us', elapsed)):
+            key = 'response-stats:{0}:{1}'.format(self.name, suffix)
+            try:
+                cache.incr(key, value)
+            except ValueError:
+                cache.set(key, value, None)
+
+    def stats(self):
+        keys = {
+            suffix: 'response-stats:{0}:{1}'.format(self.name, suffix)
+            for suffix in ('hits', 'misses', 'hits_us', 'misses_us')
+        }
+        values = cache.get_many(keys.values())
+        hits, misses, hits_us, misses_us = (
+            values.get(keys[suffix], 0)
+            for suffix in ('hits', 'misses', 'hits_us', 'misses_us')
+        )
+        total = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': hits / total if total else 0,
+            'avg_hit_ms': hits_us / hits / 1000 if hits else 0,
+            'avg_miss_ms': misses_us / misses / 1000 if misses else 0,
+        }
+
+
+recipe_list_cache = ResponseCache('recipes-list', RECIPES)
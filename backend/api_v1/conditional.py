@@ -0,0 +1,29 @@
+import hashlib
+from calendar import timegm
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5(repr(parts).encode('utf-8')).hexdigest())
+
+
+def respond_conditionally(request, validators, respond):
+    if validators is None:
+        return respond()
+    etag, last_modified = validators
+    if last_modified is not None:
+        last_modified = timegm(last_modified.utctimetuple())
+    response = get_conditional_response(request, etag=etag,
+                                        last_modified=last_modified)
+    if response is None:
+        response = respond()
+    if response.status_code in (status.HTTP_200_OK,
+                                status.HTTP_304_NOT_MODIFIED):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ['Authorization'])
+    return response
@@ -0,0 +1,45 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import CustomUser, FavoriteRecipe, Follow, Recipe, ShoppingCart
+
+COUNTERS = {
+    FavoriteRecipe: ('recipe', Recipe, 'favorites_count'),
+    ShoppingCart: ('recipe', Recipe, 'in_carts_count'),
+    Recipe: ('author', CustomUser, 'recipes_count'),
+    Follow: ('following', CustomUser, 'followers_count'),
+}
+
+
+def change_counters(source, pks, delta):
+    _, model, field = COUNTERS[source]
+    queryset = model.objects.filter(pk__in=pks)
+    if delta < 0:
+        queryset = queryset.filter(**{field + '__gte': -delta})
+    queryset.update(**{field: F(field) + delta, 'updated_at': timezone.now()})
+
+
+def change_counter(instance, delta):
+    relation, _, _ = COUNTERS[type(instance)]
+    change_counters(type(instance), [getattr(instance, relation + '_id')],
+                    delta)
+
+
+def get_actual_count(source, relation):
+    return Coalesce(Subquery(
+        source.objects.filter(**{relation: OuterRef('pk')}).order_by().values(
+            relation).annotate(total=Count('pk')).values('total'),
+        output_field=IntegerField()
+    ), Value(0))
+
+
+def recount():
+    fixed = {}
+    for source, (relation, model, field) in COUNTERS.items():
+        actual = get_actual_count(source, relation)
+        fixed[field] = model.objects.annotate(actual=actual).exclude(
+            **{field: F('actual')}).count()
+        if fixed[field]:
+            model.objects.update(**{field: actual})
+    return fixed
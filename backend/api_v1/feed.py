@@ -0,0 +1,84 @@
+from collections import defaultdict
+from itertools import islice
+
+from django.conf import settings
+
+from .models import CustomUser, FeedItem, Follow, Recipe
+
+BATCH_SIZE = 1000
+
+
+def save_items(items):
+    items = iter(items)
+    saved = 0
+    while True:
+        batch = list(islice(items, BATCH_SIZE))
+        if not batch:
+            return saved
+        FeedItem.objects.bulk_create(batch, ignore_conflicts=True)
+        saved += len(batch)
+
+
+def is_popular(author):
+    return author.followers_count > settings.FEED_FANOUT_LIMIT
+
+
+def fan_out(recipe):
+    if is_popular(recipe.author):
+        return 0
+    followers = Follow.objects.filter(
+        following=recipe.author_id).values_list('user', flat=True)
+    return save_items(
+        FeedItem(user_id=user_id, recipe=recipe, pub_date=recipe.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_ids):
+    authors = list(CustomUser.objects.filter(
+        id__in=author_ids, followers_count__lte=settings.FEED_FANOUT_LIMIT
+    ).values_list('id', flat=True))
+    if not authors:
+        return 0
+    recipes = Recipe.objects.latest_per_author(
+        authors, settings.FEED_BACKFILL_SIZE).values_list('id', 'pub_date')
+    return save_items(
+        FeedItem(user_id=user_id, recipe_id=recipe_id, pub_date=pub_date)
+        for recipe_id, pub_date in recipes.iterator()
+    )
+
+
+def prune(user_id, author_ids):
+    FeedItem.objects.filter(user_id=user_id,
+                            recipe__author_id__in=author_ids).delete()
+
+
+def get_sources(user):
+    sources = [(FeedItem.objects.filter(user=user), 'pub_date', 'recipe_id')]
+    popular = list(Follow.objects.filter(
+        user=user, following__followers_count__gt=settings.FEED_FANOUT_LIMIT
+    ).values_list('following', flat=True))
+    if popular:
+        sources.append((Recipe.objects.filter(author__in=popular),
+                        'pub_date', 'id'))
+    return sources
+
+
+def rebuild():
+    FeedItem.objects.all().delete()
+    authors = list(CustomUser.objects.filter(
+        followers_count__gt=0,
+        followers_count__lte=settings.FEED_FANOUT_LIMIT
+    ).values_list('id', flat=True))
+    recipes = defaultdict(list)
+    for recipe_id, author_id, pub_date in Recipe.objects.latest_per_author(
+            authors, settings.FEED_BACKFILL_SIZE).values_list(
+                'id', 'author', 'pub_date').iterator():
+        recipes[author_id].append((recipe_id, pub_date))
+    follows = Follow.objects.filter(following__in=authors).values_list(
+        'user', 'following')
+    return save_items(
+        FeedItem(user_id=user_id, recipe_id=recipe_id, pub_date=pub_date)
+        for user_id, author_id in follows.iterator()
+        for recipe_id, pub_date in recipes[author_id]
+    )
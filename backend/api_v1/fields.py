@@ -1,20 +1,32 @@
 import base64
-import imghdr
+import binascii
+import io
 import uuid
 
 import six
+from django.conf import settings
 from django.core.files.base import ContentFile
+from PIL import Image
 from rest_framework import serializers
 
 
 class Base64ImageField(serializers.ImageField):
+    default_error_messages = {
+        'too_large': 'Размер изображения не должен превышать {max_bytes} байт',
+        'too_big': 'Размер изображения не должен превышать '
+                   '{max_dimension}x{max_dimension} пикселей',
+    }
+
     def to_internal_value(self, data):
         if isinstance(data, six.string_types):
             if 'data:' in data and ';base64,' in data:
                 header, data = data.split(';base64,')
+            max_bytes = settings.RECIPE_IMAGE_MAX_BYTES
+            if len(data) * 3 // 4 > max_bytes:
+                self.fail('too_large', max_bytes=max_bytes)
             try:
                 decoded_file = base64.b64decode(data)
-            except TypeError:
+            except (TypeError, binascii.Error):
                 self.fail('invalid_image')
             file_name = str(uuid.uuid4())[:12]
             file_extension = self.get_file_extension(file_name, decoded_file)
@@ -23,6 +35,13 @@ class Base64ImageField(serializers.ImageField):
         return super(Base64ImageField, self).to_internal_value(data)
 
     def get_file_extension(self, file_name, decoded_file):
-        extension = imghdr.what(file_name, decoded_file)
+        try:
+            image = Image.open(io.BytesIO(decoded_file))
+        except (IOError, Image.DecompressionBombError):
+            self.fail('invalid_image')
+        max_dimension = settings.RECIPE_IMAGE_MAX_DIMENSION
+        if max(image.size) > max_dimension:
+            self.fail('too_big', max_dimension=max_dimension)
+        extension = (image.format or '').lower()
         extension = 'jpg' if extension == 'jpeg' else extension
         return extension
@@ -0,0 +1,81 @@
+from rest_framework.exceptions import ValidationError
+from rest_framework.serializers import ListSerializer
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def parse_names(value):
+    return [name.strip() for name in value.split(',') if name.strip()]
+
+
+class Fieldset:
+    def __init__(self, fields, expand=(), sparse=False):
+        self.fields = tuple(fields)
+        self.expand = frozenset(expand)
+        self.sparse = sparse
+        self.names = frozenset(self.fields)
+
+    def __contains__(self, name):
+        return name in self.names
+
+    def includes_any(self, *names):
+        return not self.names.isdisjoint(names)
+
+    def is_expanded(self, name):
+        return name in self.names and (not self.sparse or name in self.expand)
+
+    @property
+    def key(self):
+        return self.fields, tuple(sorted(self.expand))
+
+
+def get_fieldset(request, available, expandable=(), optional=()):
+    params = request.query_params
+    if FIELDS_PARAM not in params and EXPAND_PARAM not in params:
+        return Fieldset(available, expandable)
+    requested = parse_names(params.get(FIELDS_PARAM, ''))
+    expand = parse_names(params.get(EXPAND_PARAM, ''))
+    errors = {}
+    unknown = [name for name in requested if name not in available]
+    if unknown:
+        errors[FIELDS_PARAM] = 'Неизвестные поля: {0}'.format(
+            ', '.join(unknown))
+    unknown = [name for name in expand
+               if name not in expandable and name not in optional]
+    if unknown:
+        errors[EXPAND_PARAM] = 'Нельзя раскрыть поля: {0}'.format(
+            ', '.join(unknown))
+    if errors:
+        raise ValidationError(errors)
+    selected = set(requested or available).union(expand)
+    return Fieldset(
+        [name for name in (*available, *optional) if name in selected],
+        expand, sparse=True)
+
+
+class SparseFieldsMixin:
+    collapsed_fields = {}
+    optional_fields = {}
+
+    def is_top_level(self):
+        parent = self.parent
+        if isinstance(parent, ListSerializer):
+            parent = parent.parent
+        return parent is None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        fieldset = self.context.get('fieldset')
+        if fieldset is None or not self.is_top_level():
+            return fields
+        for name, field in self.optional_fields.items():
+            if fieldset.is_expanded(name):
+                fields[name] = field()
+        for name in list(fields):
+            if name not in fieldset:
+                del fields[name]
+            elif (name in self.collapsed_fields
+                  and not fieldset.is_expanded(name)):
+                fields[name] = self.collapsed_fields[name]()
+        return fields
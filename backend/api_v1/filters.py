@@ -1,4 +1,6 @@
 import django_filters
+from django.db.models import Count
+from rest_framework.exceptions import ValidationError
 
 from .models import Ingredient, Recipe, TagsInRecipe
 
@@ -8,10 +10,14 @@ class RecipeFilter(django_filters.FilterSet):
     is_in_shopping_cart = django_filters.CharFilter(
         method='is_in_shopping_cart_filter')
     tags = django_filters.CharFilter(method='tags_filter')
+    search = django_filters.CharFilter(method='search_filter')
+    ordering = django_filters.CharFilter(method='ordering_filter')
+    ordering_fields = ('pub_date', 'favorites_count')
 
     class Meta:
         model = Recipe
-        fields = ['author', 'is_favorited', 'is_in_shopping_cart', 'tags']
+        fields = ['author', 'is_favorited', 'is_in_shopping_cart', 'tags',
+                  'search', 'ordering']
 
     def is_favorited_filter(self, queryset, name, value):
         is_favorited = self.request.query_params.get('is_favorited')
@@ -27,13 +33,34 @@ class RecipeFilter(django_filters.FilterSet):
         return Recipe.objects.none()
 
     def tags_filter(self, queryset, name, value):
-        tags = self.request.query_params.getlist('tags')
+        tags = set(self.request.query_params.getlist('tags'))
         if (len(tags) != 0):
+            mode = self.request.query_params.get('tags_mode', 'any')
+            if mode not in ('any', 'all'):
+                raise ValidationError(
+                    {'tags_mode': 'Допустимые значения: any, all'})
             recipes_with_tags = TagsInRecipe.objects.filter(
-                tag__slug__in=tags).values_list('recipe', flat=True)
+                tag__slug__in=tags).values('recipe')
+            if mode == 'all':
+                recipes_with_tags = recipes_with_tags.annotate(
+                    tags_count=Count('tag')
+                ).filter(tags_count=len(tags)).values('recipe')
             return queryset.filter(id__in=recipes_with_tags)
         return queryset
 
+    def search_filter(self, queryset, name, value):
+        if not value.strip():
+            return queryset
+        return queryset.search(value)
+
+    def ordering_filter(self, queryset, name, value):
+        if value.lstrip('-') not in self.ordering_fields:
+            fields = ', '.join(self.ordering_fields)
+            raise ValidationError(
+                {'ordering': 'Допустимые значения: {0}'.format(fields)})
+        direction = '-' if value.startswith('-') else ''
+        return queryset.order_by(value, direction + 'id')
+
 
 class IngredientFilter(django_filters.FilterSet):
     name = django_filters.CharFilter(method='ingredients_filter')
@@ -0,0 +1,89 @@
+import io
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+VARIANTS = {
+    'thumbnail': (160, 160),
+    'card': (480, 480),
+    'full': (1280, 1280),
+}
+FORMATS = {
+    'webp': ('WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('JPEG', {'quality': 85, 'optimize': True, 'progressive': True}),
+}
+VARIANTS_DIR = 'variants'
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.RECIPE_IMAGE_WORKERS,
+            thread_name_prefix='recipe-images'
+        )
+    return _executor
+
+
+def variant_name(name, variant, extension):
+    directory, filename = os.path.split(name)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(directory, VARIANTS_DIR,
+                        '{0}_{1}.{2}'.format(stem, variant, extension))
+
+
+def variant_urls(name):
+    if not name:
+        return None
+    return {
+        variant: {
+            extension: default_storage.url(
+                variant_name(name, variant, extension))
+            for extension in FORMATS
+        }
+        for variant in VARIANTS
+    }
+
+
+def has_variants(name):
+    return all(
+        default_storage.exists(variant_name(name, variant, extension))
+        for variant in VARIANTS
+        for extension in FORMATS
+    )
+
+
+def generate_variants(name):
+    with default_storage.open(name) as file:
+        image = Image.open(file)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    for variant, size in VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail(size, Image.LANCZOS)
+        for extension, (image_format, options) in FORMATS.items():
+            output = resized
+            if image_format == 'JPEG' and output.mode == 'RGBA':
+                output = Image.new('RGB', resized.size, (255, 255, 255))
+                output.paste(resized, mask=resized.getchannel('A'))
+            buffer = io.BytesIO()
+            output.save(buffer, image_format, **options)
+            path = variant_name(name, variant, extension)
+            if default_storage.exists(path):
+                default_storage.delete(path)
+            default_storage.save(path, ContentFile(buffer.getvalue()))
+
+
+def prepare_variants(name, force=False):
+    if force or not has_variants(name):
+        generate_variants(name)
@@ -0,0 +1,133 @@
+import json
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+
+from api_v1.models import CustomUser, Ingredient, Recipe, Tag
+
+
+class Command(BaseCommand):
+    help = ('Замеряет время ответа, число SQL-запросов и пик памяти '
+            'основных эндпоинтов и сравнивает их с сохранённым baseline')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--save-baseline', metavar='PATH')
+        parser.add_argument('--compare', metavar='PATH')
+        parser.add_argument(
+            '--tolerance', type=float, default=0.25,
+            help='Допустимый рост медианного времени относительно baseline'
+        )
+
+    def get_scenarios(self):
+        user = CustomUser.objects.annotate(
+            cart_size=Count('purchases', distinct=True),
+            follows=Count('follower', distinct=True),
+        ).order_by('-cart_size', '-follows').first()
+        recipe = Recipe.objects.order_by('-pub_date').first()
+        author = Recipe.objects.values('author').annotate(
+            total=Count('id')).order_by('-total').first()
+        tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        ingredient = Ingredient.objects.order_by('id').first()
+        if None in (user, recipe, author, ingredient) or not tags:
+            raise CommandError(
+                'Нет данных для замеров, запустите generate_dataset')
+        token, _ = Token.objects.get_or_create(user=user)
+        client = Client(HTTP_AUTHORIZATION='Token {0}'.format(token.key))
+        prefix = ingredient.name[:3]
+        return client, [
+            ('recipes-list', '/api/recipes/', {'limit': 20}),
+            ('recipes-list-cards', '/api/recipes/',
+             {'limit': 20, 'fields': 'id,name,image,cooking_time'}),
+            ('recipes-list-tags', '/api/recipes/',
+             {'limit': 20, 'tags': tags}),
+            ('recipes-list-author', '/api/recipes/',
+             {'limit': 20, 'author': author['author']}),
+            ('recipes-list-favorited', '/api/recipes/',
+             {'limit': 20, 'is_favorited': 1}),
+            ('recipes-list-deep-page', '/api/recipes/',
+             {'limit': 20, 'page': 50}),
+            ('recipes-search', '/api/recipes/',
+             {'limit': 20, 'search': recipe.name}),
+            ('recipes-detail', '/api/recipes/{0}/'.format(recipe.id), {}),
+            ('recipes-feed', '/api/recipes/feed/', {'limit': 20}),
+            ('users-subscriptions', '/api/users/subscriptions/',
+             {'limit': 10, 'recipes_limit': 3}),
+            ('ingredients-search', '/api/ingredients/', {'name': prefix}),
+            ('ingredients-autocomplete', '/api/ingredients/autocomplete/',
+             {'name': prefix}),
+            ('download-shopping-cart', '/api/recipes/download_shopping_cart/',
+             {}),
+        ]
+
+    def measure(self, client, url, params, iterations):
+        self.request(client, url, params)
+        timings = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            status = self.request(client, url, params)
+            timings.append((time.perf_counter() - start) * 1000)
+        with CaptureQueriesContext(connection) as context:
+            self.request(client, url, params)
+        queries = len(context)
+        tracemalloc.start()
+        self.request(client, url, params)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        timings.sort()
+        return {
+            'status': status,
+            'median_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(timings[int(len(timings) * 0.95) - 1], 3),
+            'queries': queries,
+            'peak_kb': round(peak / 1024, 1),
+        }
+
+    def request(self, client, url, params):
+        response = client.get(url, params)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response.status_code
+
+    def handle(self, *args, **options):
+        client, scenarios = self.get_scenarios()
+        results = {}
+        for name, url, params in scenarios:
+            results[name] = self.measure(client, url, params,
+                                         options['iterations'])
+            self.stdout.write(
+                '{0:<28} {status} median {median_ms:>9} ms  '
+                'p95 {p95_ms:>9} ms  queries {queries:>4}  '
+                'peak {peak_kb:>9} KB'.format(name, **results[name]))
+        if options['save_baseline']:
+            with open(options['save_baseline'], 'w') as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+        if options['compare']:
+            self.compare(results, options['compare'], options['tolerance'])
+
+    def compare(self, results, path, tolerance):
+        with open(path) as file:
+            baseline = json.load(file)
+        regressions = []
+        for name, result in results.items():
+            expected = baseline.get(name)
+            if expected is None:
+                continue
+            if result['queries'] > expected['queries']:
+                regressions.append('{0}: запросов {1} вместо {2}'.format(
+                    name, result['queries'], expected['queries']))
+            limit = expected['median_ms'] * (1 + tolerance)
+            if result['median_ms'] > limit:
+                regressions.append('{0}: медиана {1} мс вместо {2} мс'.format(
+                    name, result['median_ms'], expected['median_ms']))
+        if regressions:
+            raise CommandError('Регрессии производительности:\n{0}'.format(
+                '\n'.join(regressions)))
+        self.stdout.write(self.style.SUCCESS('Регрессий не найдено'))
@@ -0,0 +1,22 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from api_v1.similar import BLOCK_SIZE, rebuild
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает списки похожих рецептов по ингредиентам и тегам '
+            'в пуле процессов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count())
+        parser.add_argument('--block-size', type=int, default=BLOCK_SIZE)
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        recipes, saved = rebuild(options['workers'], options['block_size'])
+        self.stdout.write(
+            'Рецептов: {0}, связей: {1}, время: {2:.1f} с'.format(
+                recipes, saved, time.perf_counter() - start))
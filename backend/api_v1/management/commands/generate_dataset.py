@@ -0,0 +1,188 @@
+import random
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api_v1.caching import RECIPES, bump_generation
+from api_v1.models import (CustomUser, FavoriteRecipe, Follow, Ingredient,
+                           IngredientInRecipe, Recipe, ShoppingCart, Tag,
+                           TagsInRecipe)
+from api_v1.search import rebuild_index
+
+TAGS = [
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+    ('Десерт', '#F5C542', 'dessert'),
+    ('Выпечка', '#C27C3E', 'bakery'),
+]
+BATCH_SIZE = 2000
+
+
+def zipf_weights(size, exponent):
+    return [1 / (rank + 1) ** exponent for rank in range(size)]
+
+
+def batched(objects, size=BATCH_SIZE):
+    iterator = iter(objects)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class Command(BaseCommand):
+    help = ('Заполняет базу синтетическими пользователями, рецептами, '
+            'подписками, избранным и корзинами для нагрузочных замеров')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--follows-per-user', type=int, default=20)
+        parser.add_argument('--favorites-per-user', type=int, default=30)
+        parser.add_argument('--cart-per-user', type=int, default=5)
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help='Показатель распределения Ципфа для авторов и ингредиентов'
+        )
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument(
+            '--ingredients', default='../data/ingredients.csv',
+            help='Каталог ингредиентов, загружается если таблица пуста'
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        if not Ingredient.objects.exists():
+            call_command('load_ingredients', options['ingredients'],
+                         stdout=self.stdout)
+        ingredient_ids = list(Ingredient.objects.values_list('id', flat=True))
+        if not ingredient_ids:
+            raise CommandError('Каталог ингредиентов пуст')
+        with transaction.atomic():
+            tag_ids = self.create_tags()
+            user_ids = self.create_users(options['users'])
+            recipe_ids = self.create_recipes(
+                options['recipes'], user_ids, ingredient_ids, tag_ids,
+                options['ingredients_per_recipe'], options['skew'])
+            self.create_relations(user_ids, recipe_ids, options)
+            call_command('recount_counters', stdout=self.stdout)
+            call_command('rebuild_shopping_lists', stdout=self.stdout)
+            call_command('rebuild_feeds', stdout=self.stdout)
+            rebuild_index()
+        call_command('build_similar_recipes', stdout=self.stdout)
+        bump_generation(RECIPES)
+        self.stdout.write(self.style.SUCCESS(
+            'Создано пользователей: {0}, рецептов: {1}'.format(
+                len(user_ids), len(recipe_ids))
+        ))
+
+    def create_tags(self):
+        for name, color, slug in TAGS:
+            Tag.objects.get_or_create(
+                slug=slug, defaults={'name': name, 'color': color})
+        return list(Tag.objects.values_list('id', flat=True))
+
+    def create_users(self, count):
+        password = make_password('benchmark-password')
+        start = CustomUser.objects.count()
+        users = (
+            CustomUser(
+                username='bench{0}'.format(number),
+                email='bench{0}@foodgram.ru'.format(number),
+                first_name='Имя{0}'.format(number),
+                last_name='Фамилия{0}'.format(number),
+                password=password,
+            )
+            for number in range(start, start + count)
+        )
+        emails = []
+        for batch in batched(users):
+            CustomUser.objects.bulk_create(batch)
+            emails.extend(user.email for user in batch)
+        return list(CustomUser.objects.filter(
+            email__in=emails).values_list('id', flat=True))
+
+    def create_recipes(self, count, user_ids, ingredient_ids, tag_ids,
+                       per_recipe, skew):
+        author_weights = zipf_weights(len(user_ids), skew)
+        ingredient_weights = zipf_weights(len(ingredient_ids), skew)
+        shuffled_ingredients = ingredient_ids[:]
+        self.random.shuffle(shuffled_ingredients)
+        authors = self.random.choices(user_ids, author_weights, k=count)
+        recipe_ids = []
+        for batch in batched(range(count)):
+            recipes = [
+                Recipe(
+                    author_id=authors[number],
+                    name='Рецепт {0}'.format(number),
+                    text='Описание рецепта {0}. '.format(number) * 5,
+                    cooking_time=self.random.randint(5, 180),
+                    image='recipes/benchmark.jpg',
+                )
+                for number in batch
+            ]
+            Recipe.objects.bulk_create(recipes)
+            ids = list(Recipe.objects.order_by('-id').values_list(
+                'id', flat=True)[:len(recipes)])
+            recipe_ids.extend(ids)
+            links = []
+            tags = []
+            for recipe_id in ids:
+                size = self.random.randint(max(1, per_recipe // 2),
+                                           per_recipe * 3 // 2 or 1)
+                chosen = set(self.random.choices(
+                    shuffled_ingredients, ingredient_weights, k=size))
+                links.extend(
+                    IngredientInRecipe(recipe_id=recipe_id,
+                                       ingredient_id=ingredient_id,
+                                       amount=self.random.randint(1, 500))
+                    for ingredient_id in chosen
+                )
+                tags.extend(
+                    TagsInRecipe(recipe_id=recipe_id, tag_id=tag_id)
+                    for tag_id in self.random.sample(
+                        tag_ids, self.random.randint(1, min(3, len(tag_ids))))
+                )
+            IngredientInRecipe.objects.bulk_create(links)
+            TagsInRecipe.objects.bulk_create(tags)
+        return recipe_ids
+
+    def pick(self, population, weights, count, exclude=None):
+        chosen = set(self.random.choices(population, weights, k=count))
+        chosen.discard(exclude)
+        return chosen
+
+    def create_relations(self, user_ids, recipe_ids, options):
+        user_weights = zipf_weights(len(user_ids), options['skew'])
+        recipe_weights = zipf_weights(len(recipe_ids), options['skew'])
+        follows = []
+        favorites = []
+        cart = []
+        for user_id in user_ids:
+            follows.extend(
+                Follow(user_id=user_id, following_id=author_id)
+                for author_id in self.pick(
+                    user_ids, user_weights, options['follows_per_user'],
+                    exclude=user_id)
+            )
+            favorites.extend(
+                FavoriteRecipe(user_id=user_id, recipe_id=recipe_id)
+                for recipe_id in self.pick(
+                    recipe_ids, recipe_weights, options['favorites_per_user'])
+            )
+            cart.extend(
+                ShoppingCart(user_id=user_id, recipe_id=recipe_id)
+                for recipe_id in self.pick(
+                    recipe_ids, recipe_weights, options['cart_per_user'])
+            )
+        for model, objects in ((Follow, follows),
+                               (FavoriteRecipe, favorites),
+                               (ShoppingCart, cart)):
+            for batch in batched(objects):
+                model.objects.bulk_create(batch)
@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api_v1 import images
+from api_v1.caching import RECIPES, bump_generation
+from api_v1.models import ImageVariantsStatus, Recipe
+
+
+class Command(BaseCommand):
+    help = 'Готовит превью (thumbnail, card, full) для картинок рецептов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать превью всех картинок, даже готовые'
+        )
+        parser.add_argument(
+            '--watch', type=int, metavar='SECONDS',
+            help='Не завершаться, а проверять новые картинки с этим периодом'
+        )
+
+    def handle(self, *args, **options):
+        self.process(options['force'])
+        while options['watch']:
+            time.sleep(options['watch'])
+            self.process(force=False, quiet=True)
+
+    def get_names(self, force):
+        recipes = Recipe.objects.exclude(image='').exclude(image__isnull=True)
+        if not force:
+            recipes = recipes.filter(
+                image_variants_status=ImageVariantsStatus.PENDING)
+        return list(recipes.values_list('image', flat=True).distinct())
+
+    def process(self, force, quiet=False):
+        names = self.get_names(force)
+        futures = {
+            name: images.get_executor().submit(images.prepare_variants,
+                                               name, force)
+            for name in names
+        }
+        failed = []
+        for name, future in futures.items():
+            try:
+                future.result()
+            except Exception as error:
+                failed.append(name)
+                self.stderr.write('{0}: {1}'.format(name, error))
+        ready = set(names) - set(failed)
+        self.mark(ready, ImageVariantsStatus.READY)
+        self.mark(failed, ImageVariantsStatus.FAILED)
+        if names:
+            bump_generation(RECIPES)
+        if names or not quiet:
+            self.stdout.write(self.style.SUCCESS(
+                'Обработано картинок: {0}, с ошибками: {1}'.format(
+                    len(ready), len(failed))
+            ))
+
+    def mark(self, names, status):
+        # Картинку могли заменить, пока готовились превью: статус меняется
+        # только у рецептов, где она осталась прежней.
+        if names:
+            Recipe.objects.filter(image__in=names).update(
+                image_variants_status=status, updated_at=timezone.now())
@@ -0,0 +1,195 @@
+import csv
+import io
+import json
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api_v1.caching import INGREDIENTS, RECIPES, bump_generation
+from api_v1.models import Ingredient
+
+JSON_CHUNK_SIZE = 64 * 1024
+
+
+def normalize_name(value):
+    return ' '.join(str(value).split())
+
+
+def normalize_unit(value):
+    return ' '.join(str(value).split()).lower()
+
+
+def read_csv(path):
+    with open(path, encoding='utf-8', newline='') as file:
+        for row in csv.reader(file):
+            if len(row) >= 2:
+                yield row[-2], row[-1]
+
+
+def read_json(path):
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf-8') as file:
+        buffer = file.read(JSON_CHUNK_SIZE).lstrip()
+        if not buffer.startswith('['):
+            raise CommandError('Ожидается JSON-массив ингредиентов')
+        buffer = buffer[1:]
+        while True:
+            buffer = buffer.lstrip().lstrip(',').lstrip()
+            if buffer.startswith(']'):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except ValueError:
+                chunk = file.read(JSON_CHUNK_SIZE)
+                if not chunk:
+                    raise CommandError('Некорректный JSON в {0}'.format(path))
+                buffer += chunk
+                continue
+            buffer = buffer[end:]
+            yield (item.get('name', item.get('title')),
+                   item.get('measurement_unit', item.get('dimension')))
+
+
+class CSVStream:
+    def __init__(self, rows):
+        self.rows = rows
+        self.line = io.StringIO()
+        self.writer = csv.writer(self.line)
+        self.buffer = b''
+
+    def read(self, size=-1):
+        while size < 0 or len(self.buffer) < size:
+            try:
+                self.writer.writerow(next(self.rows))
+            except StopIteration:
+                break
+            self.buffer += self.line.getvalue().encode('utf-8')
+            self.line.seek(0)
+            self.line.truncate()
+        if size < 0:
+            size = len(self.buffer)
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+class Command(BaseCommand):
+    help = 'Загружает каталог ингредиентов из CSV или JSON файла'
+
+    readers = {
+        '.csv': read_csv,
+        '.json': read_json,
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к ingredients.csv/.json')
+        parser.add_argument(
+            '--format', choices=['csv', 'json'],
+            help='Формат файла, по умолчанию определяется по расширению'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            raise CommandError('Файл {0} не найден'.format(path))
+        extension = '.{0}'.format(options['format']) if options['format'] \
+            else os.path.splitext(path)[1].lower()
+        if extension not in self.readers:
+            raise CommandError('Неизвестный формат файла {0}'.format(path))
+        self.rows_seen = 0
+        rows = self.normalize(self.readers[extension](path))
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                inserted, updated = self.load_with_copy(rows)
+            else:
+                inserted, updated = self.load_with_orm(
+                    rows, options['batch_size'])
+        bump_generation(INGREDIENTS)
+        bump_generation(RECIPES)
+        unchanged = self.rows_seen - inserted - updated
+        self.stdout.write(self.style.SUCCESS(
+            'Добавлено: {0}, обновлено: {1}, без изменений: {2}'.format(
+                inserted, updated, unchanged)
+        ))
+
+    def normalize(self, rows):
+        seen = set()
+        for name, unit in rows:
+            if not name or not unit:
+                continue
+            name, unit = normalize_name(name), normalize_unit(unit)
+            key = (name.lower(), unit)
+            if key in seen:
+                continue
+            seen.add(key)
+            self.rows_seen += 1
+            yield name, unit
+
+    def load_with_copy(self, rows):
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        key = (
+            "lower(regexp_replace(trim(i.name), '\\s+', ' ', 'g')) "
+            "= lower(s.name) "
+            "AND lower(regexp_replace(trim(i.measurement_unit), '\\s+', ' ', "
+            "'g')) = s.measurement_unit"
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredient_staging '
+                '(name varchar(200), measurement_unit varchar(50)) '
+                'ON COMMIT DROP'
+            )
+            cursor.copy_expert(
+                'COPY ingredient_staging (name, measurement_unit) '
+                'FROM STDIN WITH (FORMAT csv)',
+                CSVStream(rows)
+            )
+            cursor.execute(
+                'UPDATE {0} AS i '
+                'SET name = s.name, measurement_unit = s.measurement_unit '
+                'FROM ingredient_staging AS s '
+                'WHERE {1} AND (i.name <> s.name '
+                'OR i.measurement_unit <> s.measurement_unit)'.format(
+                    table, key)
+            )
+            updated = cursor.rowcount
+            cursor.execute(
+                'INSERT INTO {0} (name, measurement_unit) '
+                'SELECT s.name, s.measurement_unit '
+                'FROM ingredient_staging AS s '
+                'WHERE NOT EXISTS (SELECT 1 FROM {0} AS i WHERE {1})'.format(
+                    table, key)
+            )
+            inserted = cursor.rowcount
+        return inserted, updated
+
+    def load_with_orm(self, rows, batch_size):
+        existing = {
+            (normalize_name(name).lower(), normalize_unit(unit)):
+                (pk, name, unit)
+            for pk, name, unit in Ingredient.objects.values_list(
+                'id', 'name', 'measurement_unit').iterator()
+        }
+        inserted = updated = 0
+        to_create = []
+        to_update = []
+        for name, unit in rows:
+            current = existing.get((name.lower(), unit))
+            if current is None:
+                to_create.append(Ingredient(name=name, measurement_unit=unit))
+            elif current[1:] != (name, unit):
+                to_update.append(Ingredient(id=current[0], name=name,
+                                            measurement_unit=unit))
+            if len(to_create) >= batch_size:
+                Ingredient.objects.bulk_create(to_create)
+                inserted += len(to_create)
+                to_create = []
+            if len(to_update) >= batch_size:
+                Ingredient.objects.bulk_update(
+                    to_update, ['name', 'measurement_unit'])
+                updated += len(to_update)
+                to_update = []
+        Ingredient.objects.bulk_create(to_create)
+        Ingredient.objects.bulk_update(to_update, ['name', 'measurement_unit'])
+        return inserted + len(to_create), updated + len(to_update)
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from api_v1.feed import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает ленты подписок по подпискам и последним рецептам'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            saved = rebuild()
+        self.stdout.write('Записей в лентах: {0}'.format(saved))
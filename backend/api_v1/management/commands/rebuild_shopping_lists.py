@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from api_v1.shopping_list import rebuild
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает списки покупок пользователей по их корзинам'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Позиций в списках покупок: {0}'.format(rebuild()))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from api_v1.counters import recount
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает счётчики избранного, списков покупок, рецептов '
+            'и подписчиков по фактическим данным')
+
+    def handle(self, *args, **options):
+        for field, fixed in recount().items():
+            self.stdout.write('{0}: исправлено строк {1}'.format(field, fixed))
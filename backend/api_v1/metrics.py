@@ -0,0 +1,230 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from .caching import recipe_list_cache
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            yield '_bucket', {'le': repr(float(bound))}, total
+        yield '_bucket', {'le': '+Inf'}, self.count
+        yield '_sum', {}, self.sum
+        yield '_count', {}, self.count
+
+
+class Counter:
+    def __init__(self):
+        self.value = 0
+
+    def increment(self, amount):
+        self.value += amount
+
+    def samples(self):
+        yield '', {}, self.value
+
+
+class Registry:
+    histograms = {
+        'foodgram_request_duration_seconds': (
+            'Время обработки запроса', LATENCY_BUCKETS),
+        'foodgram_db_queries': (
+            'Количество SQL-запросов на один запрос', QUERY_BUCKETS),
+        'foodgram_db_duration_seconds': (
+            'Суммарное время SQL-запросов на один запрос', LATENCY_BUCKETS),
+        'foodgram_response_size_bytes': (
+            'Размер тела ответа', SIZE_BUCKETS),
+    }
+    counters = {
+        'foodgram_db_routing_total':
+            'Выбор базы данных для чтения в запросах',
+        'foodgram_db_pins_total':
+            'Закрепления пользователей за основной базой',
+    }
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def get_series(self, name, labels):
+        key = (name, tuple(sorted(labels.items())))
+        series = self.series.get(key)
+        if series is None:
+            if name in self.counters:
+                series = Counter()
+            else:
+                series = Histogram(self.histograms[name][1])
+            self.series[key] = series
+        return series
+
+    def describe(self, name):
+        if name in self.counters:
+            return self.counters[name], 'counter'
+        return self.histograms[name][0], 'histogram'
+
+    def observe(self, name, labels, value):
+        with self.lock:
+            self.get_series(name, labels).observe(value)
+
+    def increment(self, name, labels, amount=1):
+        with self.lock:
+            self.get_series(name, labels).increment(amount)
+
+    def render(self):
+        pid = str(os.getpid())
+        with self.lock:
+            series = sorted(
+                (key, list(value.samples()))
+                for key, value in self.series.items()
+            )
+        lines = []
+        described = set()
+        for (name, labels), value in series:
+            if name not in described:
+                described.add(name)
+                description, kind = self.describe(name)
+                lines.append('# HELP {0} {1}'.format(name, description))
+                lines.append('# TYPE {0} {1}'.format(name, kind))
+            labels = dict(labels, pid=pid)
+            for suffix, extra, sample in value:
+                lines.append(format_sample(
+                    name + suffix, dict(labels, **extra), sample))
+        for key, value in recipe_list_cache.stats().items():
+            name = 'foodgram_recipe_list_cache_{0}'.format(key)
+            lines.append('# TYPE {0} gauge'.format(name))
+            lines.append(format_sample(name, {'pid': pid}, value))
+        return '\n'.join(lines) + '\n'
+
+
+def format_sample(name, labels, value):
+    rendered = ','.join(
+        '{0}="{1}"'.format(key, str(label).replace('\\', '\\\\').replace(
+            '"', '\\"')) for key, label in sorted(labels.items())
+    )
+    return '{0}{{{1}}} {2}'.format(name, rendered, value)
+
+
+registry = Registry()
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+
+
+class RequestMeasurement:
+    def __init__(self):
+        self.counter = QueryCounter()
+        self.start = time.perf_counter()
+        self.size = 0
+        self.stack = ExitStack()
+        for connection in connections.all():
+            self.stack.enter_context(connection.execute_wrapper(self.counter))
+
+    def stream(self, content):
+        for chunk in content:
+            self.size += len(chunk)
+            yield chunk
+
+    def finish(self, request):
+        if self.stack is None:
+            return
+        self.stack.close()
+        self.stack = None
+        match = request.resolver_match
+        labels = {
+            'route': match.url_name or match.view_name if match
+            else 'unmatched',
+            'method': request.method,
+        }
+        registry.observe('foodgram_request_duration_seconds', labels,
+                         time.perf_counter() - self.start)
+        registry.observe('foodgram_db_queries', labels, self.counter.count)
+        registry.observe('foodgram_db_duration_seconds', labels,
+                         self.counter.duration)
+        registry.observe('foodgram_response_size_bytes', labels, self.size)
+
+
+class MeasuredStream:
+    def __init__(self, content, measurement, request):
+        self.content = content
+        self.measurement = measurement
+        self.request = request
+
+    def __iter__(self):
+        return self.measurement.stream(self.content)
+
+    def close(self):
+        # Сервер вызывает close() после отдачи последнего куска, поэтому
+        # SQL-запросы генератора и время передачи попадают в замер.
+        self.measurement.finish(self.request)
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        measurement = RequestMeasurement()
+        try:
+            response = self.get_response(request)
+        except BaseException:
+            measurement.finish(request)
+            raise
+        if response.streaming:
+            response.streaming_content = MeasuredStream(
+                response.streaming_content, measurement, request)
+        else:
+            measurement.size = len(response.content)
+            measurement.finish(request)
+        return response
+
+
+def is_metrics_allowed(request):
+    if request.user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    return bool(token) and constant_time_compare(
+        header, 'Bearer {0}'.format(token))
+
+
+def metrics_view(request):
+    if not is_metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render(),
+                        content_type='text/plain; version=0.0.4')
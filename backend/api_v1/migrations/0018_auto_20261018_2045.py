@@ -0,0 +1,20 @@
+# Generated by Django 3.0.5 on 2026-10-18 20:45
+
+import api_v1.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_v1', '0017_auto_20210731_1529'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='customuser',
+            managers=[
+                ('objects', api_v1.models.CustomUserManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.0.5 on 2026-10-18 20:57
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def delete_duplicate_tags(apps, schema_editor):
+    TagsInRecipe = apps.get_model('api_v1', 'TagsInRecipe')
+    duplicates = TagsInRecipe.objects.values('recipe', 'tag').annotate(
+        keep=Min('id'), total=Count('id')).filter(total__gt=1)
+    for duplicate in duplicates:
+        TagsInRecipe.objects.filter(
+            recipe=duplicate['recipe'], tag=duplicate['tag']
+        ).exclude(id=duplicate['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_v1', '0018_auto_20261018_2045'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicate_tags,
+                             migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='tagsinrecipe',
+            index=models.Index(fields=['tag', 'recipe'], name='tag_recipe_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tagsinrecipe',
+            constraint=models.UniqueConstraint(fields=('recipe', 'tag'), name='unique_tag_in_recipe'),
+        ),
+    ]
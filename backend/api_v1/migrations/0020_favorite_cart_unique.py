@@ -0,0 +1,42 @@
+# Generated by Django 3.0.5 on 2026-10-18 20:58
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def delete_duplicates(apps, schema_editor):
+    for model_name in ('FavoriteRecipe', 'ShoppingCart'):
+        model = apps.get_model('api_v1', model_name)
+        duplicates = model.objects.values('user', 'recipe').annotate(
+            keep=Min('id'), total=Count('id')).filter(total__gt=1)
+        for duplicate in duplicates:
+            model.objects.filter(
+                user=duplicate['user'], recipe=duplicate['recipe']
+            ).exclude(id=duplicate['keep']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_v1', '0019_tagsinrecipe_unique_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_duplicates, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='favoriterecipe',
+            index=models.Index(fields=['recipe', 'user'], name='favorite_recipe_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='shoppingcart',
+            index=models.Index(fields=['recipe', 'user'], name='shopping_cart_recipe_user_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='favoriterecipe',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_favorite_recipe'),
+        ),
+        migrations.AddConstraint(
+            model_name='shoppingcart',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_shopping_cart'),
+        ),
+    ]
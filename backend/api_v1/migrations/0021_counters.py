@@ -0,0 +1,60 @@
+# Generated by Django 3.0.5 on 2026-10-18 21:00
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('FavoriteRecipe', 'recipe', 'Recipe', 'favorites_count'),
+    ('ShoppingCart', 'recipe', 'Recipe', 'in_carts_count'),
+    ('Recipe', 'author', 'CustomUser', 'recipes_count'),
+    ('Follow', 'following', 'CustomUser', 'followers_count'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for source, relation, target, field in COUNTERS:
+        source = apps.get_model('api_v1', source)
+        apps.get_model('api_v1', target).objects.update(**{
+            field: Coalesce(Subquery(
+                source.objects.filter(**{relation: OuterRef('pk')}).order_by(
+                ).values(relation).annotate(total=Count('pk')).values(
+                    'total'),
+                output_field=IntegerField()
+            ), Value(0))
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_v1', '0020_favorite_cart_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество рецептов'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в список покупок'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['favorites_count', 'id'], name='recipe_favorites_count_idx'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 3.0.5 on 2026-10-18 21:02
+
+from django.db import migrations, models
+
+UPPER_INDEXES = (
+    ('recipe_name_upper_idx', 'api_v1_recipe', 'name'),
+    ('ingredient_name_upper_idx', 'api_v1_ingredient', 'name'),
+    ('customuser_username_upper_idx', 'api_v1_customuser', 'username'),
+    ('customuser_email_upper_idx', 'api_v1_customuser', 'email'),
+)
+
+
+def create_upper_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in UPPER_INDEXES:
+        schema_editor.execute(
+            'CREATE INDEX {0} ON {1} '
+            '(UPPER({2}::text) text_pattern_ops)'.format(name, table, column))
+
+
+def drop_upper_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in UPPER_INDEXES:
+        schema_editor.execute('DROP INDEX IF EXISTS {0}'.format(name))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_v1', '0021_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['pub_date', 'id'], name='recipe_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ingredient',
+            index=models.Index(fields=['name'], name='ingredient_name_idx'),
+        ),
+        migrations.RunPython(create_upper_indexes, drop_upper_indexes),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 3.0.5 on 2026-10-18 21:03
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+POSTGRESQL_FORWARD = (
+    """
+    CREATE FUNCTION api_v1_recipe_search_vector() RETURNS trigger AS $$
+    BEGIN
+        NEW.search_vector :=
+            setweight(to_tsvector('pg_catalog.russian',
+                                  coalesce(NEW.name, '')), 'A') ||
+            setweight(to_tsvector('pg_catalog.russian',
+                                  coalesce(NEW.text, '')), 'B');
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER api_v1_recipe_search_vector_update
+    BEFORE INSERT OR UPDATE OF name, text, search_vector ON api_v1_recipe
+    FOR EACH ROW EXECUTE PROCEDURE api_v1_recipe_search_vector()
+    """,
+    'UPDATE api_v1_recipe SET name = name',
+    'CREATE INDEX recipe_search_vector_idx ON api_v1_recipe '
+    'USING gin (search_vector)',
+)
+POSTGRESQL_BACKWARD = (
+    'DROP INDEX IF EXISTS recipe_search_vector_idx',
+    'DROP TRIGGER IF EXISTS api_v1_recipe_search_vector_update '
+    'ON api_v1_recipe',
+    'DROP FUNCTION IF EXISTS api_v1_recipe_search_vector()',
+)
+SQLITE_FORWARD = (
+    "CREATE VIRTUAL TABLE api_v1_recipe_fts USING fts5("
+    "name, text, tokenize='unicode61 remove_diacritics 2')",
+    'INSERT INTO api_v1_recipe_fts (rowid, name, text) '
+    'SELECT id, name, text FROM api_v1_recipe',
+)
+SQLITE_BACKWARD = (
+    'DROP TABLE IF EXISTS api_v1_recipe_fts',
+)
+
+
+def run_statements(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, ()):
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_v1', '0022_admin_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='Поисковый вектор'),
+        ),
+        migrations.RunPython(
+            run_statements({'postgresql': POSTGRESQL_FORWARD,
+                            'sqlite': SQLITE_FORWARD}),
+            run_statements({'postgresql': POSTGRESQL_BACKWARD,
+                            'sqlite': SQLITE_BACKWARD}),
+        ),
+    ]
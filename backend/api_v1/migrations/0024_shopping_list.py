@@ -0,0 +1,49 @@
+# Generated by Django 3.0.5 on 2026-10-18 21:05
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import F, Sum
+
+
+def fill_shopping_lists(apps, schema_editor):
+    ShoppingCart = apps.get_model('api_v1', 'ShoppingCart')
+    ShoppingListItem = apps.get_model('api_v1', 'ShoppingListItem')
+    totals = ShoppingCart.objects.values(
+        'user', ingredient=F('recipe__ingredients__ingredient')
+    ).annotate(total=Sum('recipe__ingredients__amount')).filter(
+        ingredient__isnull=False).order_by()
+    ShoppingListItem.objects.bulk_create(
+        ShoppingListItem(user_id=row['user'], ingredient_id=row['ingredient'],
+                         amount=row['total'])
+        for row in totals
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_v1', '0023_recipe_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ShoppingListItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.PositiveIntegerField(verbose_name='Количество')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list_items', to='api_v1.Ingredient', verbose_name='Ингредиент')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='shopping_list', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Позиция списка покупок',
+                'verbose_name_plural': 'Список покупок',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='shoppinglistitem',
+            constraint=models.UniqueConstraint(fields=('user', 'ingredient'), name='unique_shopping_list_item'),
+        ),
+        migrations.RunPython(fill_shopping_lists,
+                             migrations.RunPython.noop),
+    ]
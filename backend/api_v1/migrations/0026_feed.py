@@ -0,0 +1,70 @@
+# Generated by Django 3.0.5 on 2026-10-18 21:13
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_feeds(apps, schema_editor):
+    CustomUser = apps.get_model('api_v1', 'CustomUser')
+    FeedItem = apps.get_model('api_v1', 'FeedItem')
+    Follow = apps.get_model('api_v1', 'Follow')
+    Recipe = apps.get_model('api_v1', 'Recipe')
+    authors = CustomUser.objects.filter(
+        followers_count__gt=0,
+        followers_count__lte=settings.FEED_FANOUT_LIMIT
+    ).values_list('id', flat=True)
+    for author_id in authors.iterator():
+        recipes = list(Recipe.objects.filter(author_id=author_id).order_by(
+            '-pub_date', '-id').values_list(
+                'id', 'pub_date')[:settings.FEED_BACKFILL_SIZE])
+        FeedItem.objects.bulk_create(
+            FeedItem(user_id=user_id, recipe_id=recipe_id, pub_date=pub_date)
+            for user_id in Follow.objects.filter(
+                following_id=author_id).values_list('user_id', flat=True)
+            for recipe_id, pub_date in recipes
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_v1', '0025_similar_recipes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedItem',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Время публикации')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Лента подписок',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['author', 'pub_date'], name='recipe_author_pub_date_idx'),
+        ),
+        migrations.AddField(
+            model_name='feeditem',
+            name='recipe',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed_items', to='api_v1.Recipe', verbose_name='Рецепт'),
+        ),
+        migrations.AddField(
+            model_name='feeditem',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='feed', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик'),
+        ),
+        migrations.AddIndex(
+            model_name='feeditem',
+            index=models.Index(fields=['user', '-pub_date', '-recipe'], name='feed_item_user_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='feeditem',
+            constraint=models.UniqueConstraint(fields=('user', 'recipe'), name='unique_feed_item'),
+        ),
+        migrations.RunPython(fill_feeds, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 3.0.5 on 2026-10-18 21:24
+
+from django.db import migrations, models
+from django.db.models import F
+
+
+def fill_updated_at(apps, schema_editor):
+    apps.get_model('api_v1', 'CustomUser').objects.update(
+        updated_at=F('date_joined'))
+    apps.get_model('api_v1', 'Recipe').objects.update(
+        updated_at=F('pub_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_v1', '0026_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Время изменения'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, verbose_name='Время изменения'),
+        ),
+        migrations.RunPython(fill_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 3.0.5 on 2026-10-18 22:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api_v1', '0027_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_variants_status',
+            field=models.CharField(choices=[('pending', 'Ожидают обработки'), ('ready', 'Готовы'), ('failed', 'Не удалось подготовить')], db_index=True, default='pending', editable=False, max_length=10, verbose_name='Превью картинки'),
+        ),
+    ]
@@ -1,14 +1,66 @@
 from colorfield.fields import ColorField
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVectorField)
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connections, models
+from django.db.models import (BooleanField, Exists, F, OuterRef, Prefetch,
+                              Value, Window)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import RowNumber
 
+from .search import FTS_TABLE, get_fts_query
 
-class CustomUser(AbstractUser):
+
+class CustomUserQuerySet(models.QuerySet):
+    def with_subscription(self, user):
+        if user.is_anonymous:
+            return self.annotate(
+                is_subscribed=Value(False, output_field=BooleanField()))
+        return self.annotate(is_subscribed=Exists(Follow.objects.filter(
+            user=user, following=OuterRef('pk'))))
+
+
+class CustomUserManager(UserManager.from_queryset(CustomUserQuerySet)):
+    pass
+
+
+class CountersMixin:
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.counter_fields
+            ]
+        super().save(*args, **kwargs)
+
+
+class CustomUser(CountersMixin, AbstractUser):
     email = models.EmailField(unique=True)
+    recipes_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество рецептов'
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество подписчиков'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Время изменения',
+    )
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name', 'username']
 
+    counter_fields = ('recipes_count', 'followers_count')
+
+    objects = CustomUserManager()
+
     class Meta:
         ordering = ['id']
         verbose_name = 'Пользователь'
@@ -18,7 +70,83 @@ class CustomUser(AbstractUser):
         return self.username
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    def with_user_flags(self, user):
+        if user.is_anonymous:
+            return self.annotate(
+                favorited=Value(False, output_field=BooleanField()),
+                in_shopping_cart=Value(False, output_field=BooleanField()),
+            )
+        return self.annotate(
+            favorited=Exists(FavoriteRecipe.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+        )
+
+    def with_author_subscription(self, user):
+        if user.is_anonymous:
+            return self.annotate(
+                is_subscribed=Value(False, output_field=BooleanField()))
+        return self.annotate(is_subscribed=Exists(Follow.objects.filter(
+            user=user, following=OuterRef('author'))))
+
+    def with_related(self, user):
+        authors = CustomUser.objects.with_subscription(user)
+        ingredients = IngredientInRecipe.objects.select_related(
+            'ingredient').order_by('id')
+        tags = TagsInRecipe.objects.select_related('tag').order_by('id')
+        return self.with_user_flags(user).prefetch_related(
+            Prefetch('author', queryset=authors),
+            Prefetch('ingredients', queryset=ingredients),
+            Prefetch('tags', queryset=tags),
+        )
+
+    def search(self, text):
+        if not text.strip():
+            return self
+        if connections[self.db].vendor == 'postgresql':
+            query = SearchQuery(text, config='russian')
+            return self.filter(search_vector=query).annotate(
+                rank=SearchRank(F('search_vector'), query)
+            ).order_by('-rank', '-pub_date', '-id')
+        match = get_fts_query(text)
+        if not match:
+            return self.none()
+        return self.filter(id__in=RawSQL(
+            'SELECT rowid FROM {0} WHERE {0} MATCH %s'.format(FTS_TABLE),
+            (match,)
+        )).annotate(rank=RawSQL(
+            'SELECT -bm25({0}, 10.0, 1.0) FROM {0} '
+            'WHERE {0} MATCH %s AND rowid = {1}.id'.format(
+                FTS_TABLE, self.model._meta.db_table),
+            (match,)
+        )).order_by('-rank', '-pub_date', '-id')
+
+    def latest_per_author(self, author_ids, limit=None):
+        queryset = self.filter(author__in=author_ids)
+        if limit is None:
+            return queryset
+        ranked = queryset.annotate(recipe_rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('author')],
+            order_by=F('pub_date').desc(),
+        )).order_by().values('id', 'recipe_rank')
+        sql, params = ranked.query.sql_with_params()
+        return queryset.filter(id__in=RawSQL(
+            'SELECT id FROM ({0}) AS ranked WHERE recipe_rank <= %s'.format(
+                sql),
+            (*params, limit)
+        ))
+
+
+class ImageVariantsStatus(models.TextChoices):
+    PENDING = 'pending', 'Ожидают обработки'
+    READY = 'ready', 'Готовы'
+    FAILED = 'failed', 'Не удалось подготовить'
+
+
+class Recipe(CountersMixin, models.Model):
     author = models.ForeignKey(
         to='CustomUser',
         related_name='recipes',
@@ -34,6 +162,14 @@ class Recipe(models.Model):
         null=True,
         verbose_name='Картинка'
     )
+    image_variants_status = models.CharField(
+        max_length=10,
+        choices=ImageVariantsStatus.choices,
+        default=ImageVariantsStatus.PENDING,
+        db_index=True,
+        editable=False,
+        verbose_name='Превью картинки'
+    )
     text = models.TextField(
         verbose_name='Описание',
     )
@@ -45,9 +181,40 @@ class Recipe(models.Model):
         auto_now_add=True,
         verbose_name='Время публикации',
     )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Время изменения',
+    )
+    favorites_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в избранное'
+    )
+    in_carts_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Добавлений в список покупок'
+    )
+    search_vector = SearchVectorField(
+        null=True,
+        editable=False,
+        verbose_name='Поисковый вектор'
+    )
+
+    counter_fields = ('favorites_count', 'in_carts_count')
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['favorites_count', 'id'],
+                         name='recipe_favorites_count_idx'),
+            models.Index(fields=['pub_date', 'id'],
+                         name='recipe_pub_date_idx'),
+            models.Index(fields=['author', 'pub_date'],
+                         name='recipe_author_pub_date_idx'),
+        ]
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
 
@@ -75,6 +242,9 @@ class Tag(models.Model):
         verbose_name = 'Тег'
         verbose_name_plural = 'Теги'
 
+    def __str__(self):
+        return self.name
+
 
 class Ingredient(models.Model):
     name = models.CharField(
@@ -88,9 +258,15 @@ class Ingredient(models.Model):
     )
 
     class Meta:
+        indexes = [
+            models.Index(fields=['name'], name='ingredient_name_idx')
+        ]
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Ингредиенты'
 
+    def __str__(self):
+        return f'{self.name}, {self.measurement_unit}'
+
 
 class IngredientInRecipe(models.Model):
     ingredient = models.ForeignKey(
@@ -137,6 +313,13 @@ class TagsInRecipe(models.Model):
     )
 
     class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'tag'],
+                                    name='unique_tag_in_recipe')
+        ]
+        indexes = [
+            models.Index(fields=['tag', 'recipe'], name='tag_recipe_idx')
+        ]
         verbose_name = 'Тег рецепта'
         verbose_name_plural = 'Теги рецепта'
 
@@ -156,6 +339,14 @@ class FavoriteRecipe(models.Model):
     )
 
     class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'recipe'],
+                                    name='unique_favorite_recipe')
+        ]
+        indexes = [
+            models.Index(fields=['recipe', 'user'],
+                         name='favorite_recipe_user_idx')
+        ]
         verbose_name = 'Избранный рецепт'
         verbose_name_plural = 'Избранные рецепты'
 
@@ -196,5 +387,102 @@ class ShoppingCart(models.Model):
         verbose_name='Покупка')
 
     class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'recipe'],
+                                    name='unique_shopping_cart')
+        ]
+        indexes = [
+            models.Index(fields=['recipe', 'user'],
+                         name='shopping_cart_recipe_user_idx')
+        ]
         verbose_name = 'Покупка'
         verbose_name_plural = 'Покупки'
+
+
+class ShoppingListItem(models.Model):
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'ingredient'],
+                                    name='unique_shopping_list_item')
+        ]
+        verbose_name = 'Позиция списка покупок'
+        verbose_name_plural = 'Список покупок'
+
+    def __str__(self):
+        return f'{self.ingredient} для {self.user}'
+
+
+class SimilarRecipe(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_recipes',
+        verbose_name='Рецепт'
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='similar_to',
+        verbose_name='Похожий рецепт'
+    )
+    score = models.FloatField(
+        verbose_name='Степень сходства'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['recipe', 'similar'],
+                                    name='unique_similar_recipe')
+        ]
+        indexes = [
+            models.Index(fields=['recipe', '-score'],
+                         name='similar_recipe_score_idx')
+        ]
+        verbose_name = 'Похожий рецепт'
+        verbose_name_plural = 'Похожие рецепты'
+
+
+class FeedItem(models.Model):
+    user = models.ForeignKey(
+        CustomUser,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Подписчик'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='feed_items',
+        verbose_name='Рецепт'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Время публикации'
+    )
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'recipe'],
+                                    name='unique_feed_item')
+        ]
+        indexes = [
+            models.Index(fields=['user', '-pub_date', '-recipe'],
+                         name='feed_item_user_pub_date_idx')
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Лента подписок'
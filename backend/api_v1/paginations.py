@@ -1,7 +1,194 @@
+import hashlib
+import json
+from base64 import b64decode, b64encode
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .caching import RECIPES, get_generation
 
 
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 6
     page_size_query_param = 'limit'
     max_page_size = 1000
+
+
+def get_cached_count(queryset):
+    try:
+        sql, params = queryset.query.sql_with_params()
+    except EmptyResultSet:
+        return 0
+    key = 'count:{0}:{1}'.format(get_generation(RECIPES), hashlib.md5(
+        '{0}{1!r}'.format(sql, params).encode('utf-8')).hexdigest())
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, settings.RECIPES_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+class SlicingPaginator(Paginator):
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        return self._get_page(
+            self.object_list[bottom:bottom + self.per_page], number, self)
+
+
+class CachedCountPaginator(SlicingPaginator):
+    @cached_property
+    def count(self):
+        return get_cached_count(self.object_list)
+
+
+def seek(queryset, position, reverse, date_field='pub_date', id_field='id'):
+    queryset = queryset.order_by('-' + date_field, '-' + id_field)
+    if position is None:
+        return queryset
+    pub_date, pk = position
+    if reverse:
+        return queryset.filter(
+            Q(**{date_field + '__gt': pub_date})
+            | Q(**{date_field: pub_date, id_field + '__gt': pk})
+        ).reverse()
+    return queryset.filter(
+        Q(**{date_field + '__lt': pub_date})
+        | Q(**{date_field: pub_date, id_field + '__lt': pk})
+    )
+
+
+class RecipePagination(StandardResultsSetPagination):
+    django_paginator_class = CachedCountPaginator
+    cursor_query_param = 'cursor'
+    user_scoped_params = ('is_favorited', 'is_in_shopping_cart')
+
+    def is_user_scoped(self, request):
+        return any(param in request.query_params
+                   for param in self.user_scoped_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_query_param not in request.query_params:
+            self.cursor_mode = False
+            if self.is_user_scoped(request):
+                self.django_paginator_class = SlicingPaginator
+            return super().paginate_queryset(queryset, request, view)
+        if 'ordering' in request.query_params:
+            raise ValidationError(
+                {'ordering': 'Сортировка недоступна при курсорной пагинации'})
+        if request.query_params.get('search', '').strip():
+            raise ValidationError(
+                {'search': 'Поиск недоступен при курсорной пагинации'})
+        self.cursor_mode = True
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if self.is_user_scoped(request):
+            self.count = queryset.count()
+        else:
+            self.count = get_cached_count(queryset)
+        position, reverse = self.decode_cursor(
+            request.query_params[self.cursor_query_param])
+        results = list(seek(queryset, position, reverse)[:self.page_size + 1])
+        return self.set_page(results, position, reverse)
+
+    def set_page(self, results, position, reverse):
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+            self.has_previous, self.has_next = has_more, True
+        else:
+            self.has_previous = position is not None
+            self.has_next = has_more
+        self.page = results
+        return results
+
+    def decode_cursor(self, cursor):
+        if not cursor:
+            return None, False
+        try:
+            data = json.loads(b64decode(cursor.encode('ascii')))
+            pub_date = parse_datetime(data['d'])
+            pk = int(data['i'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound('Неверный курсор')
+        if pub_date is None:
+            raise NotFound('Неверный курсор')
+        return (pub_date, pk), bool(data.get('r'))
+
+    def encode_cursor(self, recipe, reverse=False):
+        if isinstance(recipe, dict):
+            pub_date, pk = recipe['pub_date'], recipe['id']
+        else:
+            pub_date, pk = recipe.pub_date, recipe.id
+        data = {'d': pub_date.isoformat(), 'i': pk}
+        if reverse:
+            data['r'] = 1
+        cursor = b64encode(json.dumps(data).encode('utf-8')).decode('ascii')
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_count(self):
+        if self.cursor_mode:
+            return self.count
+        return self.page.paginator.count
+
+    def get_next_link(self):
+        if not self.cursor_mode:
+            return super().get_next_link()
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.cursor_mode:
+            return super().get_previous_link()
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('count', self.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
+
+
+class FeedPagination(RecipePagination):
+    def paginate_feed(self, queryset, sources, request):
+        self.cursor_mode = True
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        position, reverse = self.decode_cursor(
+            request.query_params.get(self.cursor_query_param))
+        keys = set()
+        for source, date_field, id_field in sources:
+            keys.update(seek(source, position, reverse, date_field,
+                             id_field).values_list(
+                date_field, id_field)[:self.page_size + 1])
+        keys = sorted(keys, reverse=not reverse)[:self.page_size + 1]
+        recipes = queryset.in_bulk([pk for _, pk in keys])
+        return self.set_page([recipes[pk] for _, pk in keys if pk in recipes],
+                             position, reverse)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data)
+        ]))
@@ -0,0 +1,106 @@
+import threading
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
+from django.dispatch import Signal
+
+from .counters import COUNTERS
+from .models import Follow
+
+CREATED = 'created'
+EXISTS = 'exists'
+DELETED = 'deleted'
+NOT_FOUND = 'not_found'
+FORBIDDEN = 'forbidden'
+
+relations_added = Signal()
+relations_removed = Signal()
+
+state = threading.local()
+
+
+def in_batch():
+    return getattr(state, 'batch', False)
+
+
+@contextmanager
+def batch():
+    state.batch = True
+    try:
+        yield
+    finally:
+        state.batch = False
+
+
+def get_results(pks, statuses):
+    return [{'id': pk, 'status': statuses.get(pk, NOT_FOUND)}
+            for pk in pks]
+
+
+def create_once(model, user, pk):
+    relation, _, _ = COUNTERS[model]
+    try:
+        with transaction.atomic():
+            model.objects.create(user=user, **{relation + '_id': pk})
+    except IntegrityError:
+        return False
+    return True
+
+
+def delete_once(model, user, pk):
+    relation, _, _ = COUNTERS[model]
+    # Число удалённых строк берётся из самого DELETE: при гонке двух
+    # удалений счётчики уменьшит только то, которое удалило строку.
+    with batch():
+        deleted, _ = model.objects.filter(
+            user=user, **{relation + '_id': pk}).delete()
+    if deleted:
+        relations_removed.send(sender=model, user=user, pks=[pk])
+    return deleted
+
+
+def insert(model, user, pks):
+    relation, _, _ = COUNTERS[model]
+    try:
+        with transaction.atomic():
+            model.objects.bulk_create(
+                [model(user=user, **{relation + '_id': pk}) for pk in pks])
+    except IntegrityError:
+        # Часть связей успели создать параллельно: строки добавляются по
+        # одной, и счётчики обновляют обработчики post_save.
+        return [pk for pk in pks if create_once(model, user, pk)]
+    relations_added.send(sender=model, user=user, pks=pks)
+    return pks
+
+
+@transaction.atomic
+def add(model, user, pks):
+    relation, target, _ = COUNTERS[model]
+    found = set(target.objects.filter(pk__in=pks).values_list(
+        'pk', flat=True))
+    statuses = {}
+    if model is Follow and user.pk in found:
+        found.discard(user.pk)
+        statuses[user.pk] = FORBIDDEN
+    existing = set(model.objects.filter(
+        user=user, **{relation + '__in': found}
+    ).values_list(relation, flat=True))
+    created = sorted(found - existing)
+    if created:
+        created = insert(model, user, created)
+    statuses.update(dict.fromkeys(found - set(created), EXISTS))
+    statuses.update(dict.fromkeys(created, CREATED))
+    return get_results(pks, statuses)
+
+
+@transaction.atomic
+def remove(model, user, pks):
+    relation, _, _ = COUNTERS[model]
+    queryset = model.objects.filter(user=user, **{relation + '__in': pks})
+    deleted = sorted(set(queryset.select_for_update().values_list(
+        relation, flat=True)))
+    if deleted:
+        with batch():
+            queryset.delete()
+        relations_removed.send(sender=model, user=user, pks=deleted)
+    return get_results(pks, dict.fromkeys(deleted, DELETED))
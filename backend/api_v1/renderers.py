@@ -0,0 +1,119 @@
+import csv
+import io
+import os
+from abc import ABCMeta, abstractmethod
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    def can_use_orjson(self, accepted_media_type, renderer_context):
+        return (orjson is not None and self.compact and not self.ensure_ascii
+                and self.get_indent(accepted_media_type,
+                                    renderer_context or {}) is None)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or not self.can_use_orjson(accepted_media_type,
+                                                   renderer_context):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        return orjson.dumps(
+            data, default=self.encoder_class().default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        ).replace(b'\xe2\x80\xa8', b'\\u2028').replace(
+            b'\xe2\x80\xa9', b'\\u2029')
+
+
+class ShoppingListRenderer(BaseRenderer, metaclass=ABCMeta):
+    charset = 'utf-8'
+    streaming = True
+
+    @abstractmethod
+    def stream(self, rows):
+        pass
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            return str(data.get('detail', data)).encode('utf-8')
+        return b''.join(self.stream(data))
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, rows):
+        for row in rows:
+            yield '{name} -- {amount} {measurement_unit}\n'.format(
+                **row).encode(self.charset)
+
+
+class Echo:
+    def write(self, value):
+        return value
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, rows):
+        writer = csv.writer(Echo())
+        yield writer.writerow(
+            ['name', 'amount', 'measurement_unit']).encode(self.charset)
+        for row in rows:
+            yield writer.writerow([
+                row['name'], row['amount'], row['measurement_unit']
+            ]).encode(self.charset)
+
+
+class ShoppingListPDFRenderer(ShoppingListRenderer):
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    streaming = False
+    font_name = 'ShoppingListFont'
+    font_size = 12
+
+    def get_font(self):
+        from reportlab.pdfbase import pdfmetrics
+        from reportlab.pdfbase.ttfonts import TTFont
+
+        font_path = settings.SHOPPING_LIST_PDF_FONT
+        if not font_path or not os.path.exists(font_path):
+            raise ImproperlyConfigured(
+                'Не найден шрифт с кириллицей для PDF: {0}'.format(font_path))
+        if self.font_name not in pdfmetrics.getRegisteredFontNames():
+            pdfmetrics.registerFont(TTFont(self.font_name, font_path))
+        return self.font_name
+
+    def stream(self, rows):
+        from reportlab.lib.pagesizes import A4
+        from reportlab.pdfgen import canvas
+
+        buffer = io.BytesIO()
+        pdf = canvas.Canvas(buffer, pagesize=A4)
+        font = self.get_font()
+        width, height = A4
+        margin = 50
+        line_height = self.font_size * 1.5
+        y = height - margin
+        pdf.setFont(font, self.font_size)
+        for row in rows:
+            if y < margin:
+                pdf.showPage()
+                pdf.setFont(font, self.font_size)
+                y = height - margin
+            pdf.drawString(
+                margin, y, '{name} -- {amount} {measurement_unit}'.format(
+                    **row))
+            y -= line_height
+        pdf.save()
+        yield buffer.getvalue()
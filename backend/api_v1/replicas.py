@@ -0,0 +1,91 @@
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+from .metrics import registry
+
+state = threading.local()
+
+
+PIN_COOKIE = 'replica_pin'
+
+
+def is_pinned(request):
+    # Закрепление живёт в подписанной cookie, а не в кэше процесса: его
+    # видит любой воркер, куда попадёт следующий запрос.
+    user = request.user
+    if not user.is_authenticated:
+        return False
+    value = request.get_signed_cookie(
+        PIN_COOKIE, default=None, salt=PIN_COOKIE,
+        max_age=settings.REPLICA_PIN_SECONDS)
+    return value == str(user.pk)
+
+
+def pin(response, user):
+    response.set_signed_cookie(
+        PIN_COOKIE, user.pk, salt=PIN_COOKIE,
+        max_age=settings.REPLICA_PIN_SECONDS, httponly=True, samesite='Lax')
+    registry.increment('foodgram_db_pins_total', {})
+
+
+def choose_database(request, primary=False):
+    if not settings.DATABASE_REPLICAS:
+        return DEFAULT_DB_ALIAS, 'no_replicas'
+    if primary or request.method not in SAFE_METHODS:
+        return DEFAULT_DB_ALIAS, 'write'
+    if is_pinned(request):
+        return DEFAULT_DB_ALIAS, 'pinned'
+    return random.choice(settings.DATABASE_REPLICAS), 'replica'
+
+
+class ReplicaReadMixin:
+    primary_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        database, reason = choose_database(
+            request, self.action in self.primary_actions)
+        state.read_database = database
+        registry.increment('foodgram_db_routing_total',
+                           {'database': database, 'reason': reason})
+
+
+class ReplicaMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        state.read_database = None
+        state.wrote = False
+        try:
+            response = self.get_response(request)
+            user = getattr(request, 'user', None)
+            if state.wrote and user is not None and user.is_authenticated:
+                pin(response, user)
+            return response
+        finally:
+            state.read_database = None
+            state.wrote = False
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if getattr(state, 'wrote', False):
+            return DEFAULT_DB_ALIAS
+        return getattr(state, 'read_database', None)
+
+    def db_for_write(self, model, **hints):
+        state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
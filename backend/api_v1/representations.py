@@ -0,0 +1,134 @@
+from collections import defaultdict
+from operator import itemgetter
+
+from django.core.files.storage import default_storage
+from rest_framework.renderers import BrowsableAPIRenderer
+from rest_framework.response import Response
+
+from .models import CustomUser, IngredientInRecipe, TagsInRecipe
+from .renderers import FastJSONRenderer
+from .serializers import (CustomUserSerializer, RecipeSerializer,
+                          get_image_variants)
+
+RECIPE_FIELDS = tuple(RecipeSerializer.Meta.fields)
+RECIPE_EXPANDABLE = tuple(RecipeSerializer.collapsed_fields)
+RECIPE_COLUMNS = {
+    'name': 'name',
+    'author': 'author',
+    'image': 'image',
+    'image_variants': 'image_variants_status',
+    'is_favorited': 'favorited',
+    'is_in_shopping_cart': 'in_shopping_cart',
+    'favorites_count': 'favorites_count',
+    'cooking_time': 'cooking_time',
+    'text': 'text',
+}
+AUTHOR_FIELDS = tuple(CustomUserSerializer.Meta.fields)
+AUTHOR_OPTIONAL = tuple(CustomUserSerializer.optional_fields)
+INGREDIENT_FIELDS = ('id', 'name', 'measurement_unit')
+TAG_FIELDS = ('id', 'name', 'color', 'slug')
+
+
+def get_image_url(name, request):
+    if not name:
+        return None
+    return request.build_absolute_uri(default_storage.url(name))
+
+
+def group_by_recipe(rows, keys):
+    groups = defaultdict(list)
+    for recipe_id, *values in rows:
+        groups[recipe_id].append(dict(zip(keys, values)))
+    return groups
+
+
+def group_ids(rows):
+    groups = defaultdict(list)
+    for recipe_id, pk in rows:
+        groups[recipe_id].append(pk)
+    return groups
+
+
+def get_recipe_tags(recipe_ids, expanded=True):
+    tags = TagsInRecipe.objects.filter(recipe__in=recipe_ids).order_by('id')
+    if not expanded:
+        return group_ids(tags.values_list('recipe', 'tag'))
+    return group_by_recipe(tags.values_list(
+        'recipe', 'tag__id', 'tag__name', 'tag__color', 'tag__slug'
+    ), TAG_FIELDS)
+
+
+def get_recipe_ingredients(recipe_ids, expanded=True):
+    ingredients = IngredientInRecipe.objects.filter(
+        recipe__in=recipe_ids).order_by('id')
+    if not expanded:
+        return group_ids(ingredients.values_list('recipe', 'ingredient'))
+    return group_by_recipe(ingredients.values_list(
+        'recipe', 'ingredient__id', 'ingredient__name', 'amount',
+        'ingredient__measurement_unit'
+    ), ('id', 'name', 'amount', 'measurement_unit'))
+
+
+def get_authors(author_ids, user):
+    authors = CustomUser.objects.with_subscription(user).filter(
+        id__in=author_ids).values_list(*AUTHOR_FIELDS)
+    return {
+        author['id']: author
+        for author in (dict(zip(AUTHOR_FIELDS, row)) for row in authors)
+    }
+
+
+def get_recipe_columns(fieldset):
+    columns = {'id': None, 'pub_date': None}
+    columns.update((RECIPE_COLUMNS[name], None) for name in fieldset.fields
+                   if name in RECIPE_COLUMNS)
+    if 'image_variants' in fieldset:
+        columns['image'] = None
+    return tuple(columns)
+
+
+def represent_recipes(rows, request, fieldset):
+    recipe_ids = [row['id'] for row in rows]
+    tags = ingredients = authors = {}
+    if 'tags' in fieldset:
+        tags = get_recipe_tags(recipe_ids, fieldset.is_expanded('tags'))
+    if 'ingredients' in fieldset:
+        ingredients = get_recipe_ingredients(
+            recipe_ids, fieldset.is_expanded('ingredients'))
+    if fieldset.is_expanded('author'):
+        authors = get_authors({row['author'] for row in rows}, request.user)
+    getters = {
+        'id': itemgetter('id'),
+        'tags': lambda row: tags[row['id']],
+        'ingredients': lambda row: ingredients[row['id']],
+        'author': (lambda row: authors[row['author']])
+        if fieldset.is_expanded('author') else itemgetter('author'),
+        'image': lambda row: get_image_url(row['image'], request),
+        'image_variants': lambda row: get_image_variants(
+            row['image'], row['image_variants_status'], request),
+    }
+    for name, column in RECIPE_COLUMNS.items():
+        getters.setdefault(name, itemgetter(column))
+    selected = [(name, getters[name]) for name in fieldset.fields]
+    return [{name: get(row) for name, get in selected} for row in rows]
+
+
+class ValuesListMixin:
+    values_fields = ()
+    renderer_classes = (FastJSONRenderer, BrowsableAPIRenderer)
+
+    def get_values(self, queryset):
+        return queryset.values(*self.values_fields)
+
+    def represent(self, rows):
+        return rows
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.respond_page(page)
+        return Response(self.represent(list(queryset)))
+
+    def respond_page(self, page):
+        return self.get_paginated_response(self.represent(page))
@@ -0,0 +1,40 @@
+import re
+
+from django.db import connections
+
+FTS_TABLE = 'api_v1_recipe_fts'
+WORD_RE = re.compile(r'\w+')
+
+
+def get_fts_query(text):
+    return ' '.join('"{0}"*'.format(word)
+                    for word in WORD_RE.findall(text.lower()))
+
+
+def update_fts(recipe, using='default'):
+    with connections[using].cursor() as cursor:
+        cursor.execute('DELETE FROM {0} WHERE rowid = %s'.format(FTS_TABLE),
+                       [recipe.pk])
+        cursor.execute(
+            'INSERT INTO {0} (rowid, name, text) VALUES (%s, %s, %s)'.format(
+                FTS_TABLE),
+            [recipe.pk, recipe.name, recipe.text]
+        )
+
+
+def delete_fts(recipe, using='default'):
+    with connections[using].cursor() as cursor:
+        cursor.execute('DELETE FROM {0} WHERE rowid = %s'.format(FTS_TABLE),
+                       [recipe.pk])
+
+
+def rebuild_index(using='default'):
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('UPDATE api_v1_recipe SET name = name')
+        elif connection.vendor == 'sqlite':
+            cursor.execute('DELETE FROM {0}'.format(FTS_TABLE))
+            cursor.execute(
+                'INSERT INTO {0} (rowid, name, text) '
+                'SELECT id, name, text FROM api_v1_recipe'.format(FTS_TABLE))
@@ -1,18 +1,48 @@
+from functools import partial
+
+from django.conf import settings
+from django.db import transaction
 from rest_framework import serializers
-from rest_framework.generics import get_object_or_404
 from rest_framework.validators import UniqueTogetherValidator
 
+from . import feed, relations, shopping_list
 from.fields import Base64ImageField
-from .models import (CustomUser, FavoriteRecipe, Follow, Ingredient,
-                     IngredientInRecipe, Recipe, ShoppingCart, Tag,
-                     TagsInRecipe)
+from .fieldsets import SparseFieldsMixin
+from .images import variant_urls
+from .models import (CustomUser, FavoriteRecipe, Follow, ImageVariantsStatus,
+                     Ingredient, IngredientInRecipe, Recipe, ShoppingCart,
+                     Tag, TagsInRecipe)
+
+
+def get_image_variants(name, status, request=None):
+    if status != ImageVariantsStatus.READY:
+        return None
+    urls = variant_urls(name)
+    if urls is None or request is None:
+        return urls
+    return {
+        variant: {extension: request.build_absolute_uri(url)
+                  for extension, url in formats.items()}
+        for variant, formats in urls.items()
+    }
 
 
-class CustomUserSerializer(serializers.ModelSerializer):
+class IdListSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1), allow_empty=False,
+        max_length=settings.RELATIONS_BATCH_MAX_SIZE)
+
+
+class CustomUserSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField(
         method_name='get_subscription')
+    optional_fields = {
+        'recipes': lambda: ShortRecipeSerializer(many=True, read_only=True),
+    }
 
     def get_subscription(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context['request'].user
         if user.is_anonymous:
             return False
@@ -21,7 +51,7 @@ class CustomUserSerializer(serializers.ModelSerializer):
     class Meta:
         model = CustomUser
         fields = ['email', 'id', 'username', 'first_name', 'last_name',
-                  'is_subscribed']
+                  'is_subscribed', 'recipes_count', 'followers_count']
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -59,7 +89,12 @@ class TagsInRecipeSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'color', 'slug']
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class IngredientAmountSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    amount = serializers.IntegerField()
+
+
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     ingredients = IngredientInRecipeSerializer(many=True)
     author = CustomUserSerializer(read_only=True)
     tags = TagsInRecipeSerializer(many=True, read_only=True)
@@ -71,59 +106,126 @@ class RecipeSerializer(serializers.ModelSerializer):
     is_in_shopping_cart = serializers.SerializerMethodField(
         method_name='is_recipe_in_shopping_cart')
     image = Base64ImageField(max_length=None, use_url=True)
-
-    def create(self, validated_data):
-        ingredients_data = validated_data.pop('ingredients')
-        ingredients_set = set()
-        for ingredient in ingredients_data:
-            if int(ingredient['amount']) < 0:
+    image_variants = serializers.SerializerMethodField()
+    collapsed_fields = {
+        'author': partial(serializers.PrimaryKeyRelatedField, read_only=True),
+        'tags': partial(serializers.SlugRelatedField, many=True,
+                        read_only=True, slug_field='tag_id'),
+        'ingredients': partial(serializers.SlugRelatedField, many=True,
+                               read_only=True, slug_field='ingredient_id'),
+    }
+
+    def get_ingredients(self, ingredients_data):
+        amounts = {}
+        for ingredient in IngredientAmountSerializer(
+                many=True).run_validation(ingredients_data):
+            if ingredient['amount'] < 0:
                 raise serializers.ValidationError(
                     'Введите целое число больше 0 для количества ингредиента'
                 )
-            if ingredient['id'] in ingredients_set:
+            ingredient_id = ingredient['id']
+            if ingredient_id in amounts:
                 raise serializers.ValidationError(
                     'Ингредиенты в рецепте не должны повторяться'
                 )
-            ingredients_set.add(ingredient['id'])
-        tags_data = validated_data.pop('tags')
-        recipe = Recipe.objects.create(**validated_data)
-        for ingredient_json in ingredients_data:
-            ingredient = get_object_or_404(Ingredient, id=ingredient_json['id'])
-            IngredientInRecipe.objects.create(
-                recipe=recipe,
-                ingredient=ingredient,
-                amount=ingredient_json['amount']
+            amounts[ingredient_id] = ingredient['amount']
+        existing = set(Ingredient.objects.filter(
+            id__in=amounts).values_list('id', flat=True))
+        if existing != set(amounts):
+            raise serializers.ValidationError(
+                'Ингредиенты с id {0} не найдены'.format(
+                    sorted(set(amounts) - existing))
             )
-        for tag_ in tags_data:
-            tag = get_object_or_404(Tag, id=tag_)
-            TagsInRecipe.objects.create(recipe=recipe, tag=tag)
-        return recipe
+        return amounts
+
+    def get_tags(self, tags_data):
+        tags = set(serializers.ListField(
+            child=serializers.IntegerField()).run_validation(tags_data))
+        existing = set(Tag.objects.filter(
+            id__in=tags).values_list('id', flat=True))
+        if existing != tags:
+            raise serializers.ValidationError(
+                'Теги с id {0} не найдены'.format(sorted(tags - existing))
+            )
+        return tags
+
+    def get_annotated(self, recipe):
+        user = self.context['request'].user
+        return Recipe.objects.with_related(user).get(pk=recipe.pk)
 
+    @transaction.atomic
+    def create(self, validated_data):
+        amounts = self.get_ingredients(validated_data.pop('ingredients'))
+        tags = self.get_tags(validated_data.pop('tags'))
+        recipe = Recipe.objects.create(**validated_data)
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(recipe=recipe, ingredient_id=ingredient_id,
+                               amount=amount)
+            for ingredient_id, amount in amounts.items()
+        )
+        TagsInRecipe.objects.bulk_create(
+            TagsInRecipe(recipe=recipe, tag_id=tag_id) for tag_id in tags
+        )
+        feed.fan_out(recipe)
+        return self.get_annotated(recipe)
+
+    @transaction.atomic
     def update(self, instance, validated_data):
-        ingredients_data = validated_data.pop('ingredients')
-        tags_data = validated_data.pop('tags')
+        amounts = self.get_ingredients(validated_data.pop('ingredients'))
+        tags = self.get_tags(validated_data.pop('tags'))
         instance.name = validated_data.get('name', instance.name)
-        instance.image = validated_data.get('image', instance.image)
+        if 'image' in validated_data:
+            instance.image = validated_data['image']
+            instance.image_variants_status = ImageVariantsStatus.PENDING
         instance.text = validated_data.get('text', instance.text)
         instance.cooking_time = validated_data.get('cooking_time',
                                                    instance.cooking_time)
 
-        IngredientInRecipe.objects.filter(recipe=instance).delete()
-        TagsInRecipe.objects.filter(recipe=instance).delete()
-        for ingredient_json in ingredients_data:
-            ingredient = get_object_or_404(Ingredient, id=ingredient_json['id'])
-            IngredientInRecipe.objects.create(
-                recipe=instance,
-                ingredient=ingredient,
-                amount=ingredient_json['amount']
+        to_update = []
+        to_delete = []
+        changes = {}
+        for row in IngredientInRecipe.objects.filter(recipe=instance):
+            amount = amounts.pop(row.ingredient_id, None)
+            if amount is None:
+                changes[row.ingredient_id] = -row.amount
+                to_delete.append(row.id)
+            elif amount != row.amount:
+                changes[row.ingredient_id] = amount - row.amount
+                row.amount = amount
+                to_update.append(row)
+        if to_delete:
+            with relations.batch():
+                IngredientInRecipe.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            IngredientInRecipe.objects.bulk_update(to_update, ['amount'])
+        if amounts:
+            IngredientInRecipe.objects.bulk_create(
+                IngredientInRecipe(recipe=instance,
+                                   ingredient_id=ingredient_id,
+                                   amount=amount)
+                for ingredient_id, amount in amounts.items()
+            )
+        changes.update(amounts)
+        shopping_list.add_amounts(shopping_list.get_customers(instance.id),
+                                  changes)
+
+        current_tags = set(TagsInRecipe.objects.filter(
+            recipe=instance).values_list('tag_id', flat=True))
+        if current_tags - tags:
+            TagsInRecipe.objects.filter(
+                recipe=instance, tag_id__in=current_tags - tags).delete()
+        if tags - current_tags:
+            TagsInRecipe.objects.bulk_create(
+                TagsInRecipe(recipe=instance, tag_id=tag_id)
+                for tag_id in tags - current_tags
             )
-
-        for tag_ in tags_data:
-            tag = get_object_or_404(Tag, id=tag_)
-            TagsInRecipe.objects.create(recipe=instance, tag=tag)
 
         instance.save()
-        return instance
+        return self.get_annotated(instance)
+
+    def get_image_variants(self, obj):
+        return get_image_variants(obj.image.name, obj.image_variants_status,
+                                  self.context.get('request'))
 
     def validate_cooking_time(self, data):
         if data < 1:
@@ -133,12 +235,16 @@ class RecipeSerializer(serializers.ModelSerializer):
         return data
 
     def conversion_bool(self, obj):
+        if hasattr(obj, 'favorited'):
+            return obj.favorited
         user = self.context['request'].user
         if user.is_anonymous:
             return False
         return FavoriteRecipe.objects.filter(user=user, recipe=obj).exists()
 
     def is_recipe_in_shopping_cart(self, obj):
+        if hasattr(obj, 'in_shopping_cart'):
+            return obj.in_shopping_cart
         user = self.context['request'].user
         if user.is_anonymous:
             return False
@@ -147,29 +253,33 @@ class RecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ['id', 'tags', 'name', 'ingredients', 'author', 'image',
-                  'is_favorited', 'is_in_shopping_cart', 'cooking_time', 'text']
+                  'image_variants', 'is_favorited', 'is_in_shopping_cart',
+                  'favorites_count', 'cooking_time', 'text']
 
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
+    image_variants = serializers.SerializerMethodField()
+
+    def get_image_variants(self, obj):
+        return get_image_variants(obj.image.name, obj.image_variants_status,
+                                  self.context.get('request'))
+
     class Meta:
         model = Recipe
-        fields = ['id', 'name', 'image', 'cooking_time']
+        fields = ['id', 'name', 'image', 'image_variants', 'cooking_time']
 
 
 class FollowSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField(
         method_name='is_user_subscribed')
     recipes = ShortRecipeSerializer(many=True, read_only=True)
-    recipes_count = serializers.SerializerMethodField(
-        method_name='get_recipes_count')
 
     def is_user_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context['request'].user
         return Follow.objects.filter(user=user, following=obj).exists()
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
     class Meta:
         fields = ['email', 'id', 'username', 'first_name', 'last_name',
                   'is_subscribed', 'recipes', 'recipes_count']
@@ -0,0 +1,96 @@
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import (CustomUser, IngredientInRecipe, ShoppingCart,
+                     ShoppingListItem)
+
+BATCH_SIZE = 2000
+
+
+def get_recipe_amounts(recipe_id, sign=1):
+    return {
+        ingredient_id: amount * sign
+        for ingredient_id, amount in IngredientInRecipe.objects.filter(
+            recipe_id=recipe_id).values_list('ingredient_id', 'amount')
+    }
+
+
+def get_total_amounts(recipe_ids, sign=1):
+    return {
+        ingredient_id: total * sign
+        for ingredient_id, total in IngredientInRecipe.objects.filter(
+            recipe_id__in=recipe_ids
+        ).values('ingredient_id').annotate(total=Sum('amount')).values_list(
+            'ingredient_id', 'total').order_by()
+    }
+
+
+def get_customers(recipe_id):
+    return ShoppingCart.objects.filter(recipe_id=recipe_id).values('user')
+
+
+def plan_changes(user_ids, amounts, items):
+    to_create = []
+    to_update = []
+    to_delete = []
+    for user_id in user_ids:
+        for ingredient_id, amount in amounts.items():
+            item = items.get((user_id, ingredient_id))
+            if item is None:
+                if amount > 0:
+                    to_create.append(ShoppingListItem(
+                        user_id=user_id, ingredient_id=ingredient_id,
+                        amount=amount))
+            elif item.amount + amount > 0:
+                item.amount += amount
+                to_update.append(item)
+            else:
+                to_delete.append(item.pk)
+    return to_create, to_update, to_delete
+
+
+@transaction.atomic
+def add_amounts(users, amounts):
+    amounts = {key: value for key, value in amounts.items() if value}
+    if not amounts:
+        return
+    user_ids = list(CustomUser.objects.select_for_update().filter(
+        pk__in=users).order_by('pk').values_list('pk', flat=True))
+    items = {
+        (item.user_id, item.ingredient_id): item
+        for item in ShoppingListItem.objects.filter(
+            user__in=user_ids, ingredient__in=amounts)
+    }
+    to_create, to_update, to_delete = plan_changes(user_ids, amounts, items)
+    if to_delete:
+        ShoppingListItem.objects.filter(pk__in=to_delete).delete()
+    if to_update:
+        ShoppingListItem.objects.bulk_update(to_update, ['amount'])
+    if to_create:
+        ShoppingListItem.objects.bulk_create(to_create)
+
+
+@transaction.atomic
+def rebuild(users=None):
+    items = ShoppingListItem.objects.all()
+    carts = ShoppingCart.objects.all()
+    if users is not None:
+        items = items.filter(user__in=users)
+        carts = carts.filter(user__in=users)
+    items.delete()
+    totals = carts.values(
+        'user', ingredient=F('recipe__ingredients__ingredient')
+    ).annotate(total=Sum('recipe__ingredients__amount')).filter(
+        ingredient__isnull=False).order_by()
+    batch = []
+    created = 0
+    for row in totals.iterator():
+        batch.append(ShoppingListItem(user_id=row['user'],
+                                      ingredient_id=row['ingredient'],
+                                      amount=row['total']))
+        if len(batch) >= BATCH_SIZE:
+            ShoppingListItem.objects.bulk_create(batch)
+            created += len(batch)
+            batch = []
+    ShoppingListItem.objects.bulk_create(batch)
+    return created + len(batch)
@@ -0,0 +1,180 @@
+from django.db import connections, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import authentication, feed, relations, search, shopping_list, similar
+from .caching import CATALOG, INGREDIENTS, RECIPES, bump_generation_on_commit
+from .counters import change_counter, change_counters
+from .models import (CustomUser, FavoriteRecipe, Follow, Ingredient,
+                     IngredientInRecipe, Recipe, ShoppingCart, Tag,
+                     TagsInRecipe)
+from .relations import relations_added, relations_removed
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def invalidate_ingredient_index(sender, **kwargs):
+    bump_generation_on_commit(INGREDIENTS)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_catalog(sender, **kwargs):
+    bump_generation_on_commit(CATALOG)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_save, sender=IngredientInRecipe)
+@receiver(post_delete, sender=IngredientInRecipe)
+@receiver(post_save, sender=TagsInRecipe)
+@receiver(post_delete, sender=TagsInRecipe)
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+@receiver(post_save, sender=Tag)
+@receiver(post_delete, sender=Tag)
+def invalidate_recipe_lists(sender, **kwargs):
+    bump_generation_on_commit(RECIPES)
+
+
+@receiver(post_save, sender=Recipe)
+def schedule_similar_recipes(sender, instance, raw, **kwargs):
+    if not raw:
+        transaction.on_commit(lambda: similar.schedule_update(instance.pk))
+
+
+@receiver(post_save, sender=Recipe)
+def update_search_index(sender, instance, using, **kwargs):
+    if connections[using].vendor == 'sqlite':
+        search.update_fts(instance, using)
+
+
+@receiver(post_delete, sender=Recipe)
+def delete_search_index(sender, instance, using, **kwargs):
+    if connections[using].vendor == 'sqlite':
+        search.delete_fts(instance, using)
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Follow)
+def increment_counter(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        change_counter(instance, 1)
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Follow)
+def decrement_counter(sender, instance, **kwargs):
+    if not relations.in_batch():
+        change_counter(instance, -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def add_to_shopping_list(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        shopping_list.add_amounts(
+            [instance.user_id],
+            shopping_list.get_recipe_amounts(instance.recipe_id))
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def remove_from_shopping_list(sender, instance, **kwargs):
+    if relations.in_batch():
+        return
+    shopping_list.add_amounts(
+        [instance.user_id],
+        shopping_list.get_recipe_amounts(instance.recipe_id, sign=-1))
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+@receiver(relations_added, sender=FavoriteRecipe)
+@receiver(relations_removed, sender=FavoriteRecipe)
+@receiver(relations_added, sender=Follow)
+@receiver(relations_removed, sender=Follow)
+def invalidate_listed_counters(sender, **kwargs):
+    # favorites_count и followers_count автора попадают в закэшированные
+    # страницы рецептов и в сортировку по популярности.
+    if not relations.in_batch():
+        bump_generation_on_commit(RECIPES)
+
+
+@receiver(post_save, sender=IngredientInRecipe)
+def refresh_shopping_lists(sender, instance, raw, **kwargs):
+    if not raw:
+        shopping_list.rebuild(shopping_list.get_customers(instance.recipe_id))
+
+
+@receiver(post_delete, sender=IngredientInRecipe)
+def remove_ingredient_from_shopping_lists(sender, instance, **kwargs):
+    if relations.in_batch():
+        return
+    shopping_list.add_amounts(
+        shopping_list.get_customers(instance.recipe_id),
+        {instance.ingredient_id: -instance.amount})
+
+
+@receiver(post_save, sender=Follow)
+def backfill_feed(sender, instance, created, raw, **kwargs):
+    if created and not raw:
+        feed.backfill(instance.user_id, [instance.following_id])
+
+
+@receiver(post_delete, sender=Follow)
+def prune_feed(sender, instance, **kwargs):
+    if not relations.in_batch():
+        feed.prune(instance.user_id, [instance.following_id])
+
+
+@receiver(relations_added)
+def increment_counters(sender, user, pks, **kwargs):
+    change_counters(sender, pks, 1)
+
+
+@receiver(relations_removed)
+def decrement_counters(sender, user, pks, **kwargs):
+    change_counters(sender, pks, -1)
+
+
+@receiver(relations_added, sender=ShoppingCart)
+def add_recipes_to_shopping_list(sender, user, pks, **kwargs):
+    shopping_list.add_amounts([user.pk],
+                              shopping_list.get_total_amounts(pks))
+
+
+@receiver(relations_removed, sender=ShoppingCart)
+def remove_recipes_from_shopping_list(sender, user, pks, **kwargs):
+    shopping_list.add_amounts([user.pk],
+                              shopping_list.get_total_amounts(pks, sign=-1))
+
+
+@receiver(relations_added, sender=Follow)
+def backfill_feed_batch(sender, user, pks, **kwargs):
+    feed.backfill(user.pk, pks)
+
+
+@receiver(relations_removed, sender=Follow)
+def prune_feed_batch(sender, user, pks, **kwargs):
+    feed.prune(user.pk, pks)
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    authentication.invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidate_user_tokens(sender, instance, created, raw, update_fields,
+                           **kwargs):
+    if created or raw or update_fields == frozenset(['last_login']):
+        return
+    authentication.invalidate_user(instance.pk)
@@ -0,0 +1,248 @@
+import logging
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from multiprocessing import Pool
+
+import numpy as np
+from django.conf import settings
+from django.db import OperationalError, connection, connections, transaction
+from django.db.models import Count
+from scipy import sparse
+
+from .models import IngredientInRecipe, Recipe, SimilarRecipe, TagsInRecipe
+
+logger = logging.getLogger(__name__)
+
+FETCH_SIZE = 100000
+BLOCK_SIZE = 512
+CANDIDATES = 1000
+MIN_PRUNED_FREQUENCY = 100
+UPDATE_ATTEMPTS = 3
+RETRY_DELAY = 0.5
+
+_executor = None
+_worker_state = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=1,
+                                       thread_name_prefix='similar-recipes')
+    return _executor
+
+
+def fetch_pairs(queryset):
+    iterator = queryset.iterator(chunk_size=FETCH_SIZE)
+    chunks = []
+    while True:
+        chunk = list(islice(iterator, FETCH_SIZE))
+        if not chunk:
+            break
+        chunks.append(np.array(chunk, dtype=np.int64))
+    if not chunks:
+        return np.empty((0, 2), dtype=np.int64)
+    return np.concatenate(chunks)
+
+
+def get_frequencies(ingredient_ids):
+    return dict(IngredientInRecipe.objects.filter(
+        ingredient__in=ingredient_ids
+    ).values('ingredient').annotate(total=Count('id')).values_list(
+        'ingredient', 'total').order_by())
+
+
+def get_pruning_limit(total):
+    return max(total * settings.SIMILAR_RECIPES_MAX_SHARE,
+               MIN_PRUNED_FREQUENCY)
+
+
+def normalize_rows(matrix):
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1
+    return sparse.diags(1 / norms) @ matrix
+
+
+def build_matrix(recipe_ids=None):
+    ingredients = IngredientInRecipe.objects.order_by()
+    tags = TagsInRecipe.objects.order_by()
+    if recipe_ids is None:
+        ids = np.array(Recipe.objects.order_by('id').values_list(
+            'id', flat=True), dtype=np.int64)
+        total = len(ids)
+    else:
+        ids = np.unique(np.array(recipe_ids, dtype=np.int64))
+        ingredients = ingredients.filter(recipe__in=recipe_ids)
+        tags = tags.filter(recipe__in=recipe_ids)
+        total = Recipe.objects.count()
+    pairs = fetch_pairs(ingredients.values_list('recipe', 'ingredient'))
+    columns, inverse = np.unique(pairs[:, 1], return_inverse=True)
+    if recipe_ids is None:
+        frequencies = np.bincount(inverse, minlength=len(columns))
+    else:
+        known = get_frequencies(columns.tolist())
+        frequencies = np.array([known.get(int(column), 0)
+                                for column in columns], dtype=np.int64)
+    keep = frequencies[inverse] <= get_pruning_limit(total)
+    ingredient_matrix = normalize_rows(sparse.csr_matrix(
+        (np.ones(keep.sum(), dtype=np.float32),
+         (np.searchsorted(ids, pairs[keep, 0]), inverse[keep])),
+        shape=(len(ids), len(columns))
+    )).tocsr()
+    pairs = fetch_pairs(tags.values_list('recipe', 'tag'))
+    columns, inverse = np.unique(pairs[:, 1], return_inverse=True)
+    tag_matrix = np.zeros((len(ids), len(columns)), dtype=np.float32)
+    tag_matrix[np.searchsorted(ids, pairs[:, 0]), inverse] = 1
+    norms = np.linalg.norm(tag_matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return ids, ingredient_matrix, tag_matrix / norms
+
+
+def top_neighbors(ingredients, transposed, tags, rows, count):
+    weight = settings.SIMILAR_RECIPES_TAG_WEIGHT
+    products = (ingredients[rows] @ transposed).tocsr()
+    results = []
+    for offset, row in enumerate(rows):
+        start, stop = products.indptr[offset], products.indptr[offset + 1]
+        columns = products.indices[start:stop]
+        scores = products.data[start:stop]
+        keep = columns != row
+        columns, scores = columns[keep], scores[keep]
+        scores = (1 - weight) * scores + weight * (tags[columns] @ tags[row])
+        if len(scores) > count:
+            top = np.argpartition(-scores, count)[:count]
+            columns, scores = columns[top], scores[top]
+        order = np.argsort(-scores, kind='stable')
+        results.append((row, columns[order], scores[order]))
+    return results
+
+
+def _init_worker(ids, ingredients, tags, count, save):
+    global _worker_state
+    _worker_state = ids, ingredients, ingredients.T.tocsr(), tags, count, save
+
+
+def _score_block(bounds):
+    ids, ingredients, transposed, tags, count, save = _worker_state
+    results = top_neighbors(ingredients, transposed, tags,
+                            np.arange(*bounds), count)
+    if save:
+        return save_neighbors(ids, results)
+    return results
+
+
+def save_neighbors(ids, results):
+    recipe_ids = ids[[row for row, _, _ in results]].tolist()
+    objects = [
+        SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id, score=score)
+        for recipe_id, (_, columns, scores) in zip(recipe_ids, results)
+        for similar_id, score in zip(ids[columns].tolist(), scores.tolist())
+    ]
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(recipe__in=recipe_ids).delete()
+        SimilarRecipe.objects.bulk_create(objects)
+    return len(objects)
+
+
+def rebuild(workers=None, block_size=BLOCK_SIZE):
+    ids, ingredients, tags = build_matrix()
+    count = settings.SIMILAR_RECIPES_COUNT
+    blocks = [(start, min(start + block_size, len(ids)))
+              for start in range(0, len(ids), block_size)]
+    if workers == 1:
+        _init_worker(ids, ingredients, tags, count, True)
+        return len(ids), sum(map(_score_block, blocks))
+    parallel_writes = connection.vendor == 'postgresql'
+    connections.close_all()
+    saved = 0
+    with Pool(workers, initializer=_init_worker,
+              initargs=(ids, ingredients, tags, count,
+                        parallel_writes)) as pool:
+        for result in pool.imap_unordered(_score_block, blocks):
+            if not parallel_writes:
+                result = save_neighbors(ids, result)
+            saved += result
+    return len(ids), saved
+
+
+def get_candidates(recipe_id):
+    own = list(IngredientInRecipe.objects.filter(
+        recipe_id=recipe_id).values_list('ingredient', flat=True))
+    limit = get_pruning_limit(Recipe.objects.count())
+    rare = [ingredient for ingredient, total in get_frequencies(own).items()
+            if total <= limit]
+    return list(IngredientInRecipe.objects.filter(
+        ingredient__in=rare
+    ).exclude(recipe_id=recipe_id).values('recipe').annotate(
+        shared=Count('id')
+    ).order_by('-shared').values_list('recipe', flat=True)[:CANDIDATES])
+
+
+def fold_in(recipe_id, neighbors, count):
+    existing = defaultdict(dict)
+    for recipe, similar, score in SimilarRecipe.objects.filter(
+            recipe__in=list(neighbors)).values_list(
+                'recipe', 'similar', 'score'):
+        existing[recipe][similar] = score
+    updated = {}
+    for other, score in neighbors.items():
+        current = existing[other]
+        listed = current.pop(recipe_id, None) is not None
+        if len(current) < count or score > min(current.values()):
+            current[recipe_id] = score
+        elif not listed:
+            continue
+        updated[other] = sorted(current.items(), key=lambda item: item[1],
+                                reverse=True)[:count]
+    return updated
+
+
+def update_recipe(recipe_id):
+    count = settings.SIMILAR_RECIPES_COUNT
+    ids, ingredients, tags = build_matrix([recipe_id,
+                                           *get_candidates(recipe_id)])
+    row = int(np.searchsorted(ids, recipe_id))
+    _, columns, scores = top_neighbors(ingredients, ingredients.T.tocsr(),
+                                       tags, np.array([row]), len(ids))[0]
+    neighbors = {int(ids[column]): float(score)
+                 for column, score in zip(columns, scores)}
+    updated = fold_in(recipe_id, neighbors, count)
+    updated[recipe_id] = list(neighbors.items())[:count]
+    with transaction.atomic():
+        SimilarRecipe.objects.filter(similar=recipe_id).exclude(
+            recipe__in=list(updated)).delete()
+        SimilarRecipe.objects.filter(recipe__in=list(updated)).delete()
+        SimilarRecipe.objects.bulk_create(
+            SimilarRecipe(recipe_id=recipe, similar_id=similar, score=score)
+            for recipe, items in updated.items()
+            for similar, score in items
+        )
+
+
+def _update_with_retries(recipe_id):
+    for attempt in range(1, UPDATE_ATTEMPTS + 1):
+        try:
+            return update_recipe(recipe_id)
+        except OperationalError:
+            if attempt == UPDATE_ATTEMPTS:
+                raise
+            time.sleep(RETRY_DELAY * attempt)
+
+
+def _update_recipe_safely(recipe_id, close_connection=True):
+    try:
+        _update_with_retries(recipe_id)
+    except Exception:
+        logger.exception('Не удалось обновить похожие рецепты для %s',
+                         recipe_id)
+    finally:
+        if close_connection:
+            connection.close()
+
+
+def schedule_update(recipe_id):
+    if connection.vendor == 'sqlite':
+        return _update_recipe_safely(recipe_id, close_connection=False)
+    return get_executor().submit(_update_recipe_safely, recipe_id)
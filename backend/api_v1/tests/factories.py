@@ -0,0 +1,48 @@
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api_v1.models import (CustomUser, Ingredient, IngredientInRecipe, Recipe,
+                           Tag, TagsInRecipe)
+
+IMAGE = ('data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAf'
+         'FcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg==')
+
+
+def create_user(name, **fields):
+    return CustomUser.objects.create_user(
+        email='{0}@example.com'.format(name), username=name,
+        password='password', first_name='Имя', last_name='Фамилия', **fields)
+
+
+def create_ingredients(count, unit='г'):
+    return [
+        Ingredient.objects.create(name='Ингредиент {0}'.format(number),
+                                  measurement_unit=unit)
+        for number in range(count)
+    ]
+
+
+def create_tag(slug):
+    return Tag.objects.create(name='Тег {0}'.format(slug), color='#000000',
+                              slug=slug)
+
+
+def create_recipe(author, name, amounts=None, tags=(), **fields):
+    fields.setdefault('cooking_time', 10)
+    fields.setdefault('image', 'recipes/recipe.png')
+    recipe = Recipe.objects.create(author=author, name=name, text='Описание',
+                                   **fields)
+    for ingredient, amount in (amounts or {}).items():
+        IngredientInRecipe.objects.create(recipe=recipe,
+                                          ingredient=ingredient, amount=amount)
+    for tag in tags:
+        TagsInRecipe.objects.create(recipe=recipe, tag=tag)
+    return recipe
+
+
+def get_client(user=None):
+    client = APIClient()
+    if user is not None:
+        token, _ = Token.objects.get_or_create(user=user)
+        client.credentials(HTTP_AUTHORIZATION='Token {0}'.format(token.key))
+    return client
@@ -0,0 +1,48 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+
+from api_v1.authentication import get_timeout
+from api_v1.tests.factories import create_user, get_client
+
+MEMCACHED = {'default': {
+    'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache',
+    'LOCATION': '127.0.0.1:11211',
+}}
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    url = '/api/users/me/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user('user')
+        self.client = get_client(self.user)
+
+    def test_token_is_read_from_cache(self):
+        with self.assertNumQueries(3):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_logout_revokes_cached_token(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_deactivation_revokes_cached_token(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 401)
+
+    def test_login_update_keeps_cached_token(self):
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+        self.user.save(update_fields=['last_login'])
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_local_cache_keeps_tokens_briefly(self):
+        self.assertEqual(get_timeout(), 5)
+        with override_settings(CACHES=MEMCACHED):
+            self.assertEqual(get_timeout(), 300)
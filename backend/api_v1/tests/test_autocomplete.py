@@ -0,0 +1,96 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from api_v1 import autocomplete
+from api_v1.autocomplete import IngredientIndex, get_index
+from api_v1.models import Ingredient
+from api_v1.tests.factories import get_client
+
+
+class IngredientIndexTest(SimpleTestCase):
+    def setUp(self):
+        self.index = IngredientIndex([
+            (1, 'Сахарная пудра', 'г'),
+            (2, 'Ванильный сахар', 'г'),
+            (3, 'Сахар', 'г'),
+            (4, 'Тростниковыйсахар', 'г'),
+            (5, 'Соль', 'г'),
+        ])
+
+    def search(self, query, limit=10):
+        return [item['id'] for item in self.index.search(query, limit)]
+
+    def test_tiers_rank_prefix_then_word_then_substring(self):
+        self.assertEqual(self.search('сахар'), [3, 1, 2, 4])
+
+    def test_limit_cuts_lower_tiers(self):
+        self.assertEqual(self.search('сахар', 3), [3, 1, 2])
+
+    def test_case_and_yo_are_ignored(self):
+        index = IngredientIndex([(1, 'Мёд', 'г')])
+        self.assertEqual([item['id'] for item in index.search('МЕД')], [1])
+
+    def test_wrong_keyboard_layout(self):
+        self.assertEqual(self.search('cjkm'), [5])
+
+    def test_blank_query(self):
+        self.assertEqual(self.search('  '), [])
+
+
+@override_settings(INGREDIENT_INDEX_CHECK_SECONDS=0)
+class IngredientIndexRebuildTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        autocomplete._index = None
+        self.client = get_client()
+
+    def tearDown(self):
+        autocomplete._index = None
+
+    def search(self, name):
+        response = self.client.get('/api/ingredients/autocomplete/',
+                                   {'name': name})
+        self.assertEqual(response.status_code, 200)
+        return [item['name'] for item in response.data]
+
+    def test_rebuilt_after_insert_from_another_process(self):
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        self.assertEqual(self.search('соль'), ['Соль'])
+        # bulk_create не отправляет сигналов и не меняет поколение в
+        # локальном кэше, как запись из другого процесса.
+        Ingredient.objects.bulk_create(
+            [Ingredient(name='Соль морская', measurement_unit='г')])
+        self.assertEqual(self.search('соль'), ['Соль', 'Соль морская'])
+
+    def test_rebuilt_after_delete_from_another_process(self):
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        Ingredient.objects.create(name='Сода', measurement_unit='г')
+        self.assertEqual(self.search('со'), ['Сода', 'Соль'])
+        Ingredient.objects.filter(name='Сода')._raw_delete('default')
+        self.assertEqual(self.search('со'), ['Соль'])
+
+    def test_rename_is_picked_up_after_timeout(self):
+        ingredient = Ingredient.objects.create(name='Соль',
+                                               measurement_unit='г')
+        first = get_index()
+        Ingredient.objects.filter(pk=ingredient.pk).update(name='Сода')
+        self.assertIs(get_index(), first)
+        with override_settings(INGREDIENT_INDEX_TIMEOUT=0), \
+                mock.patch('api_v1.autocomplete.time.monotonic',
+                           return_value=autocomplete._index_built + 1):
+            self.assertEqual(self.search('со'), ['Сода'])
+
+    def test_not_rebuilt_without_changes(self):
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        first = get_index()
+        with self.assertNumQueries(1):
+            self.assertIs(get_index(), first)
+
+    def test_table_is_checked_once_per_interval(self):
+        Ingredient.objects.create(name='Соль', measurement_unit='г')
+        with override_settings(INGREDIENT_INDEX_CHECK_SECONDS=60):
+            first = get_index()
+            with self.assertNumQueries(0):
+                self.assertIs(get_index(), first)
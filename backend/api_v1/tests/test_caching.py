@@ -0,0 +1,47 @@
+from django.core.cache import cache
+from django.test import TransactionTestCase
+
+from api_v1.tests.factories import create_recipe, create_user, get_client
+
+
+class RecipeListCacheTest(TransactionTestCase):
+    url = '/api/recipes/'
+
+    def setUp(self):
+        cache.clear()
+        self.user = create_user('user')
+        self.author = create_user('author')
+        self.recipe = create_recipe(self.author, 'Рецепт')
+        self.anonymous = get_client()
+        self.client = get_client(self.user)
+
+    def get_recipe(self):
+        response = self.anonymous.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response, response.data['results'][0]
+
+    def test_list_is_cached(self):
+        self.assertEqual(self.get_recipe()[0]['X-Cache'], 'MISS')
+        self.assertEqual(self.get_recipe()[0]['X-Cache'], 'HIT')
+
+    def test_favorite_refreshes_cached_count(self):
+        self.assertEqual(self.get_recipe()[1]['favorites_count'], 0)
+        self.client.get('{0}{1}/favorite/'.format(self.url, self.recipe.id))
+        self.assertEqual(self.get_recipe()[1]['favorites_count'], 1)
+        self.client.delete('{0}{1}/favorite/'.format(self.url,
+                                                     self.recipe.id))
+        self.assertEqual(self.get_recipe()[1]['favorites_count'], 0)
+
+    def test_batch_favorites_refresh_cached_count(self):
+        self.get_recipe()
+        self.client.post('{0}favorite/'.format(self.url),
+                         {'ids': [self.recipe.id]}, format='json')
+        self.assertEqual(self.get_recipe()[1]['favorites_count'], 1)
+
+    def test_follow_refreshes_cached_author(self):
+        self.assertEqual(self.get_recipe()[1]['author']['followers_count'],
+                         0)
+        self.client.get('/api/users/{0}/subscribe/'.format(self.author.id))
+        response, recipe = self.get_recipe()
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(recipe['author']['followers_count'], 1)
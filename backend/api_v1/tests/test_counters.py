@@ -0,0 +1,87 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from api_v1.models import CustomUser, FavoriteRecipe, Follow, Recipe
+
+from .factories import create_recipe, create_user, get_client
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.author = create_user('author')
+        cls.recipes = [create_recipe(cls.author, 'Рецепт {0}'.format(number))
+                       for number in range(3)]
+
+    def setUp(self):
+        cache.clear()
+        self.client = get_client(self.user)
+
+    def get_user(self, user):
+        return CustomUser.objects.get(pk=user.pk)
+
+    def get_favorites_count(self, recipe):
+        return Recipe.objects.get(pk=recipe.pk).favorites_count
+
+    def test_recipes_count_follows_recipes(self):
+        self.assertEqual(self.get_user(self.author).recipes_count, 3)
+        Recipe.objects.get(pk=self.recipes[0].pk).delete()
+        self.assertEqual(self.get_user(self.author).recipes_count, 2)
+
+    def test_followers_count_follows_subscriptions(self):
+        url = '/api/users/{0}/subscribe/'.format(self.author.id)
+        self.client.get(url)
+        self.client.get(url)
+        self.assertEqual(self.get_user(self.author).followers_count, 1)
+        self.client.delete(url)
+        self.assertEqual(self.get_user(self.author).followers_count, 0)
+
+    def test_favorites_count_follows_favorites(self):
+        recipe = self.recipes[0]
+        url = '/api/recipes/{0}/favorite/'.format(recipe.id)
+        self.client.get(url)
+        self.assertEqual(self.get_favorites_count(recipe), 1)
+        response = self.client.get('/api/recipes/{0}/'.format(recipe.id))
+        self.assertEqual(response.data['favorites_count'], 1)
+        self.client.delete(url)
+        self.client.delete(url)
+        self.assertEqual(self.get_favorites_count(recipe), 0)
+
+    def test_stale_instance_does_not_overwrite_counters(self):
+        author = CustomUser.objects.get(pk=self.author.pk)
+        create_recipe(self.author, 'Ещё рецепт')
+        author.first_name = 'Другое имя'
+        author.save()
+        self.assertEqual(self.get_user(self.author).recipes_count, 4)
+
+    def test_ordering_by_favorites_count(self):
+        readers = [create_user('reader{0}'.format(number))
+                   for number in range(2)]
+        for reader in readers:
+            FavoriteRecipe.objects.create(user=reader, recipe=self.recipes[1])
+        FavoriteRecipe.objects.create(user=readers[0], recipe=self.recipes[2])
+        response = self.client.get('/api/recipes/',
+                                   {'ordering': '-favorites_count'})
+        self.assertEqual(
+            [recipe['id'] for recipe in response.data['results']],
+            [self.recipes[1].id, self.recipes[2].id, self.recipes[0].id])
+        response = self.client.get('/api/recipes/', {'ordering': 'name'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_recount_counters_repairs_drift(self):
+        Follow.objects.create(user=self.user, following=self.author)
+        Recipe.objects.filter(pk=self.recipes[0].pk).update(
+            favorites_count=5)
+        CustomUser.objects.filter(pk=self.author.pk).update(
+            recipes_count=0, followers_count=7)
+        out = StringIO()
+        call_command('recount_counters', stdout=out)
+        self.assertIn('recipes_count: исправлено строк 1', out.getvalue())
+        self.assertEqual(self.get_favorites_count(self.recipes[0]), 0)
+        author = self.get_user(self.author)
+        self.assertEqual(author.recipes_count, 3)
+        self.assertEqual(author.followers_count, 1)
@@ -0,0 +1,127 @@
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from api_v1.models import FeedItem, Follow
+
+from .factories import (IMAGE, create_ingredients, create_recipe, create_tag,
+                        create_user, get_client)
+
+
+class FeedTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.authors = [create_user('author{0}'.format(number))
+                       for number in range(3)]
+        cls.recipes = {
+            author.id: [
+                create_recipe(author, 'Рецепт {0}-{1}'.format(
+                    author.id, number)).id
+                for number in range(3)
+            ]
+            for author in cls.authors
+        }
+
+    def setUp(self):
+        cache.clear()
+        self.client = get_client(self.user)
+        self.client.get('/api/users/me/')
+
+    def subscribe(self, author):
+        response = self.client.get(
+            '/api/users/{0}/subscribe/'.format(author.id))
+        self.assertEqual(response.status_code, 200)
+
+    def get_feed(self, limit=100):
+        ids = []
+        response = self.client.get('/api/recipes/feed/', {'limit': limit})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids.extend(recipe['id'] for recipe in response.data['results'])
+            if response.data['next'] is None:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def get_expected(self, *authors):
+        return sorted((recipe for author in authors
+                       for recipe in self.recipes[author.id]), reverse=True)
+
+    def test_feed_requires_authentication(self):
+        response = get_client().get('/api/recipes/feed/')
+        self.assertEqual(response.status_code, 401)
+
+    def test_feed_shows_followed_authors_newest_first(self):
+        self.assertEqual(self.get_feed(), [])
+        self.subscribe(self.authors[0])
+        self.subscribe(self.authors[2])
+        self.assertEqual(self.get_feed(),
+                         self.get_expected(self.authors[0], self.authors[2]))
+
+    def test_cursor_pages_cover_feed_once(self):
+        for author in self.authors:
+            self.subscribe(author)
+        self.assertEqual(self.get_feed(limit=2),
+                         self.get_expected(*self.authors))
+
+    def test_unsubscribe_prunes_feed(self):
+        self.subscribe(self.authors[0])
+        self.subscribe(self.authors[1])
+        self.client.delete(
+            '/api/users/{0}/subscribe/'.format(self.authors[0].id))
+        self.assertEqual(self.get_feed(), self.get_expected(self.authors[1]))
+        self.assertFalse(FeedItem.objects.filter(
+            user=self.user, recipe__author=self.authors[0]).exists())
+
+    @override_settings(FEED_FANOUT_LIMIT=0)
+    def test_popular_authors_are_read_without_fan_out(self):
+        self.subscribe(self.authors[0])
+        self.assertFalse(FeedItem.objects.exists())
+        self.assertEqual(self.get_feed(limit=2),
+                         self.get_expected(self.authors[0]))
+
+    def test_rebuild_feeds_restores_items(self):
+        Follow.objects.create(user=self.user, following=self.authors[1])
+        FeedItem.objects.all().delete()
+        call_command('rebuild_feeds', stdout=StringIO())
+        self.assertEqual(self.get_feed(), self.get_expected(self.authors[1]))
+
+
+class FeedFanOutTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.followers = [create_user('reader{0}'.format(number))
+                         for number in range(2)]
+        for follower in cls.followers:
+            Follow.objects.create(user=follower, following=cls.author)
+        cls.tag = create_tag('breakfast')
+        cls.ingredient = create_ingredients(1)[0]
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def test_new_recipe_reaches_followers(self):
+        response = get_client(self.author).post('/api/recipes/', {
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': IMAGE,
+            'tags': [self.tag.id],
+            'ingredients': [{'id': self.ingredient.id, 'amount': 5}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        for follower in self.followers:
+            feed = get_client(follower).get('/api/recipes/feed/')
+            self.assertEqual(
+                [recipe['id'] for recipe in feed.data['results']],
+                [response.data['id']])
@@ -0,0 +1,90 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .factories import (create_ingredients, create_recipe, create_tag,
+                        create_user, get_client)
+
+
+class SparseFieldsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.author = create_user('author')
+        cls.tag = create_tag('breakfast')
+        ingredients = create_ingredients(2)
+        cls.recipes = [
+            create_recipe(cls.author, 'Рецепт {0}'.format(number),
+                          dict.fromkeys(ingredients, 5), (cls.tag,))
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = get_client(self.user)
+        self.client.get('/api/users/me/')
+
+    def get_recipes(self, **params):
+        response = self.client.get('/api/recipes/', {'limit': 10, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['results']
+
+    def get_recipe(self, **params):
+        response = self.client.get(
+            '/api/recipes/{0}/'.format(self.recipes[0].id), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_fields_select_recipe_keys(self):
+        for item in (*self.get_recipes(fields='id,name'),
+                     self.get_recipe(fields='id,name')):
+            self.assertEqual(set(item), {'id', 'name'})
+
+    def test_relations_are_collapsed_unless_expanded(self):
+        params = {'fields': 'id,author,tags,ingredients'}
+        for item in (self.get_recipes(**params)[0],
+                     self.get_recipe(**params)):
+            self.assertEqual(item['author'], self.author.id)
+            self.assertEqual(len(item['tags']), 1)
+            self.assertEqual(len(item['ingredients']), 2)
+            self.assertNotIsInstance(item['tags'][0], dict)
+        for item in (self.get_recipes(expand='author', **params)[0],
+                     self.get_recipe(expand='author', **params)):
+            self.assertEqual(item['author']['username'], 'author')
+            self.assertNotIsInstance(item['tags'][0], dict)
+
+    def test_default_response_is_fully_expanded(self):
+        item = self.get_recipe()
+        self.assertEqual(item['author']['id'], self.author.id)
+        self.assertEqual(item['tags'][0]['slug'], 'breakfast')
+
+    def test_unknown_names_are_rejected(self):
+        for url in ('/api/recipes/',
+                    '/api/recipes/{0}/'.format(self.recipes[0].id),
+                    '/api/users/'):
+            for params in ({'fields': 'id,secret'}, {'expand': 'secret'}):
+                with self.subTest(url=url, params=params):
+                    response = self.client.get(url, params)
+                    self.assertEqual(response.status_code, 400)
+                    self.assertIn(next(iter(params)), response.json())
+
+    def test_card_needs_fewer_queries_than_full_list(self):
+        with CaptureQueriesContext(connection) as full:
+            self.get_recipes()
+        with CaptureQueriesContext(connection) as cards:
+            self.get_recipes(fields='id,name,image,cooking_time')
+        self.assertLess(len(cards), len(full))
+
+    def test_user_fields_and_recipes_expand(self):
+        url = '/api/users/{0}/'.format(self.author.id)
+        response = self.client.get(url, {'fields': 'id,username'})
+        self.assertEqual(response.json(),
+                         {'id': self.author.id, 'username': 'author'})
+        response = self.client.get(url, {'fields': 'id',
+                                         'expand': 'recipes',
+                                         'recipes_limit': 2})
+        data = response.json()
+        self.assertEqual(set(data), {'id', 'recipes'})
+        self.assertEqual(len(data['recipes']), 2)
+        self.assertNotIn('recipes', self.client.get(url).json())
@@ -0,0 +1,56 @@
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.test import TestCase
+
+from api_v1.models import TagsInRecipe
+
+from .factories import create_recipe, create_tag, create_user, get_client
+
+
+class TagsModeTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        cls.breakfast, cls.dinner, cls.soup = [
+            create_tag(slug) for slug in ('breakfast', 'dinner', 'soup')]
+        cls.both = create_recipe(author, 'Оба тега',
+                                 tags=(cls.breakfast, cls.dinner))
+        cls.breakfast_only = create_recipe(author, 'Завтрак',
+                                           tags=(cls.breakfast,))
+        cls.dinner_soup = create_recipe(author, 'Суп на ужин',
+                                        tags=(cls.dinner, cls.soup))
+        create_recipe(author, 'Без тегов')
+
+    def setUp(self):
+        cache.clear()
+        self.client = get_client()
+
+    def get_ids(self, **params):
+        response = self.client.get('/api/recipes/',
+                                   {'tags': ['breakfast', 'dinner'],
+                                    'limit': 10, **params})
+        self.assertEqual(response.status_code, 200)
+        return {recipe['id'] for recipe in response.data['results']}
+
+    def test_any_is_default(self):
+        expected = {self.both.id, self.breakfast_only.id,
+                    self.dinner_soup.id}
+        self.assertEqual(self.get_ids(), expected)
+        self.assertEqual(self.get_ids(tags_mode='any'), expected)
+
+    def test_all_requires_every_tag(self):
+        self.assertEqual(self.get_ids(tags_mode='all'), {self.both.id})
+
+    def test_all_with_single_tag(self):
+        self.assertEqual(self.get_ids(tags='soup', tags_mode='all'),
+                         {self.dinner_soup.id})
+
+    def test_unknown_mode_is_rejected(self):
+        response = self.client.get('/api/recipes/',
+                                   {'tags': 'soup', 'tags_mode': 'none'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('tags_mode', response.data)
+
+    def test_tag_is_attached_to_recipe_once(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TagsInRecipe.objects.create(recipe=self.both, tag=self.dinner)
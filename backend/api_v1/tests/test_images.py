@@ -0,0 +1,99 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from api_v1 import images
+from api_v1.models import ImageVariantsStatus, Recipe
+from api_v1.tests.factories import (IMAGE, create_ingredients, create_recipe,
+                                    create_tag, create_user, get_client)
+
+
+class ImageVariantsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.tag = create_tag('tag')
+        cls.ingredient, = create_ingredients(1)
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = get_client(self.author)
+
+    def post_recipe(self):
+        response = self.client.post('/api/recipes/', {
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': IMAGE,
+            'tags': [self.tag.id],
+            'ingredients': [{'id': self.ingredient.id, 'amount': 5}],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        return Recipe.objects.get(pk=response.data['id'])
+
+    def generate(self):
+        output = io.StringIO()
+        call_command('generate_image_variants', stdout=output,
+                     stderr=io.StringIO())
+        return output.getvalue().strip()
+
+    def get_variants(self, recipe):
+        detail = self.client.get('/api/recipes/{0}/'.format(recipe.id))
+        listed = self.client.get('/api/recipes/')
+        self.assertEqual(listed.data['results'][0]['image_variants'],
+                         detail.data['image_variants'])
+        return detail.data['image_variants']
+
+    def test_variants_appear_after_generation(self):
+        recipe = self.post_recipe()
+        self.assertIsNone(self.get_variants(recipe))
+        self.assertEqual(self.generate(),
+                         'Обработано картинок: 1, с ошибками: 0')
+        variants = self.get_variants(recipe)
+        self.assertEqual(set(variants), set(images.VARIANTS))
+        self.assertTrue(images.has_variants(recipe.image.name))
+
+    def test_existing_variants_are_not_regenerated(self):
+        recipe = self.post_recipe()
+        images.generate_variants(recipe.image.name)
+        with mock.patch('api_v1.images.generate_variants') as generate:
+            self.generate()
+        generate.assert_not_called()
+        self.assertIsNotNone(self.get_variants(recipe))
+
+    def test_broken_image_is_not_retried(self):
+        name = default_storage.save('recipes/broken.png',
+                                    ContentFile(b'not an image'))
+        recipe = create_recipe(self.author, 'Рецепт', image=name)
+        self.assertEqual(self.generate(),
+                         'Обработано картинок: 0, с ошибками: 1')
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.image_variants_status,
+                         ImageVariantsStatus.FAILED)
+        self.assertIsNone(self.get_variants(recipe))
+        self.assertEqual(self.generate(),
+                         'Обработано картинок: 0, с ошибками: 0')
+
+    def test_new_image_resets_variants(self):
+        recipe = self.post_recipe()
+        self.generate()
+        response = self.client.patch(
+            '/api/recipes/{0}/'.format(recipe.id),
+            {'image': IMAGE, 'tags': [self.tag.id],
+             'ingredients': [{'id': self.ingredient.id, 'amount': 5}]},
+            format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.data['image_variants'])
+        self.assertIsNone(self.get_variants(recipe))
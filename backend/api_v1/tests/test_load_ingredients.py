@@ -0,0 +1,72 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+from api_v1.models import Ingredient
+
+
+class LoadIngredientsTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+
+    def write(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(content)
+        return path
+
+    def load(self, path, *args):
+        output = io.StringIO()
+        call_command('load_ingredients', path, *args, stdout=output)
+        return output.getvalue().strip()
+
+    def get_catalog(self):
+        return set(Ingredient.objects.values_list('name', 'measurement_unit'))
+
+    def test_repeated_load_changes_nothing(self):
+        path = self.write('ingredients.csv',
+                          'Соль,г\nСахар,г\nМолоко,мл\nСоль,г\n')
+        self.assertEqual(self.load(path),
+                         'Добавлено: 3, обновлено: 0, без изменений: 0')
+        self.assertEqual(self.load(path),
+                         'Добавлено: 0, обновлено: 0, без изменений: 3')
+        self.assertEqual(self.get_catalog(), {
+            ('Соль', 'г'), ('Сахар', 'г'), ('Молоко', 'мл')})
+
+    def test_counts_inserted_updated_and_unchanged(self):
+        Ingredient.objects.create(name='соль  морская', measurement_unit='Г')
+        Ingredient.objects.create(name='Сахар', measurement_unit='г')
+        path = self.write('ingredients.csv',
+                          'Соль морская,г\nСахар,г\nМолоко,мл\n')
+        self.assertEqual(self.load(path),
+                         'Добавлено: 1, обновлено: 1, без изменений: 1')
+        self.assertEqual(self.get_catalog(), {
+            ('Соль морская', 'г'), ('Сахар', 'г'), ('Молоко', 'мл')})
+
+    def test_small_batches(self):
+        path = self.write('ingredients.csv', ''.join(
+            'Ингредиент {0},г\n'.format(number) for number in range(7)))
+        self.assertEqual(self.load(path, '--batch-size', '2'),
+                         'Добавлено: 7, обновлено: 0, без изменений: 0')
+        self.assertEqual(Ingredient.objects.count(), 7)
+
+    def test_json_catalog(self):
+        path = self.write('ingredients.json', json.dumps([
+            {'name': 'Соль', 'measurement_unit': 'г'},
+            {'title': 'Молоко', 'dimension': 'мл'},
+        ], ensure_ascii=False))
+        self.assertEqual(self.load(path),
+                         'Добавлено: 2, обновлено: 0, без изменений: 0')
+        self.assertEqual(self.get_catalog(),
+                         {('Соль', 'г'), ('Молоко', 'мл')})
+
+    def test_missing_file(self):
+        with self.assertRaises(CommandError):
+            self.load(os.path.join(self.directory, 'missing.csv'))
@@ -0,0 +1,103 @@
+from unittest import mock
+
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from api_v1.metrics import MetricsMiddleware, Registry
+from api_v1.models import CustomUser, Ingredient
+
+
+class MetricsAccessTest(TestCase):
+    url = '/api/metrics'
+
+    def test_anonymous_request_is_forbidden(self):
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_regular_user_is_forbidden(self):
+        user = CustomUser.objects.create_user(
+            email='user@example.com', username='user', password='password')
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+    def test_staff_user_is_allowed(self):
+        user = CustomUser.objects.create_user(
+            email='staff@example.com', username='staff', password='password',
+            is_staff=True)
+        self.client.force_login(user)
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_bearer_token_is_checked(self):
+        response = self.client.get(self.url,
+                                   HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(self.url,
+                                   HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 403)
+
+    def test_empty_token_does_not_grant_access(self):
+        response = self.client.get(self.url, HTTP_AUTHORIZATION='Bearer ')
+        self.assertEqual(response.status_code, 403)
+
+
+class MetricsMiddlewareTest(TestCase):
+    def setUp(self):
+        self.registry = Registry()
+        patcher = mock.patch('api_v1.metrics.registry', self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def get_sample(self, name):
+        labels = (('method', 'GET'), ('route', 'unmatched'))
+        series = self.registry.series.get((name, labels))
+        return None if series is None else series.sum
+
+    def test_queries_of_streamed_content_are_counted(self):
+        def stream():
+            yield b'header\n'
+            yield str(Ingredient.objects.count()).encode()
+
+        def view(request):
+            Ingredient.objects.exists()
+            return StreamingHttpResponse(stream())
+
+        response = MetricsMiddleware(view)(RequestFactory().get('/'))
+        self.assertIsNone(self.get_sample('foodgram_db_queries'))
+        content = b''.join(response.streaming_content)
+        response.close()
+        self.assertEqual(self.get_sample('foodgram_db_queries'), 2)
+        self.assertEqual(self.get_sample('foodgram_response_size_bytes'),
+                         len(content))
+        Ingredient.objects.exists()
+        self.assertEqual(self.get_sample('foodgram_db_queries'), 2)
+
+    def test_regular_response_is_measured_at_once(self):
+        def view(request):
+            Ingredient.objects.exists()
+            return HttpResponse(b'body')
+
+        MetricsMiddleware(view)(RequestFactory().get('/'))
+        self.assertEqual(self.get_sample('foodgram_db_queries'), 1)
+        self.assertEqual(self.get_sample('foodgram_response_size_bytes'), 4)
+
+    def test_described_names_match_samples(self):
+        self.registry.increment('foodgram_db_routing_total',
+                                {'database': 'default', 'reason': 'write'})
+        self.registry.observe('foodgram_db_queries', {}, 1)
+        described = set()
+        helped = set()
+        for line in self.registry.render().splitlines():
+            if line.startswith('# HELP '):
+                helped.add(line.split()[2])
+            elif line.startswith('# TYPE '):
+                _, _, name, kind = line.split()
+                described.add(name)
+                if kind == 'counter':
+                    self.assertTrue(name.endswith('_total'))
+            else:
+                name = line.split('{')[0]
+                self.assertTrue(
+                    name in described or name.rsplit('_', 1)[0] in described,
+                    name)
+        self.assertLessEqual(helped, described)
+        self.assertIn('foodgram_db_routing_total', helped)
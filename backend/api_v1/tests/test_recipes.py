@@ -0,0 +1,349 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api_v1.models import (CustomUser, FavoriteRecipe, Ingredient,
+                           IngredientInRecipe, Recipe, ShoppingCart,
+                           ShoppingListItem, Tag, TagsInRecipe)
+from api_v1.tests.factories import (IMAGE, create_ingredients, create_recipe,
+                                    create_tag, create_user, get_client)
+
+
+class RecipeAPITestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = [
+            CustomUser.objects.create_user(
+                email='author{0}@example.com'.format(number),
+                username='author{0}'.format(number), password='password',
+                first_name='Имя', last_name='Фамилия')
+            for number in range(3)
+        ]
+        cls.user = cls.authors[0]
+        Tag.objects.bulk_create([
+            Tag(name='Тег {0}'.format(number),
+                color='#00000{0}'.format(number),
+                slug='tag{0}'.format(number))
+            for number in range(3)
+        ])
+        Ingredient.objects.bulk_create([
+            Ingredient(name='Ингредиент {0}'.format(number),
+                       measurement_unit='г')
+            for number in range(10)
+        ])
+        tags = list(Tag.objects.order_by('id'))
+        ingredients = list(Ingredient.objects.order_by('id'))
+        Recipe.objects.bulk_create([
+            Recipe(author=cls.authors[number % 3],
+                   name='Рецепт {0}'.format(number), text='Описание',
+                   cooking_time=10, image='recipes/recipe.png')
+            for number in range(25)
+        ])
+        recipes = list(Recipe.objects.order_by('id'))
+        IngredientInRecipe.objects.bulk_create([
+            IngredientInRecipe(recipe=recipe,
+                               ingredient=ingredients[(index + offset) % 10],
+                               amount=offset + 1)
+            for index, recipe in enumerate(recipes) for offset in range(3)
+        ])
+        TagsInRecipe.objects.bulk_create([
+            TagsInRecipe(recipe=recipe, tag=tags[index % 3])
+            for index, recipe in enumerate(recipes)
+        ])
+        FavoriteRecipe.objects.bulk_create([
+            FavoriteRecipe(user=cls.user, recipe=recipe)
+            for recipe in recipes[::2]
+        ])
+        ShoppingCart.objects.bulk_create([
+            ShoppingCart(user=cls.user, recipe=recipe)
+            for recipe in recipes[::3]
+        ])
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def authenticate(self):
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token {0}'.format(self.token.key))
+
+
+class RecipeListQueriesTest(RecipeAPITestCase):
+    def get_list(self, limit, queries):
+        cache.clear()
+        with self.assertNumQueries(queries):
+            response = self.client.get('/api/recipes/', {'limit': limit})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), limit)
+        return response.data['results']
+
+    def test_anonymous_list_queries_do_not_depend_on_page_size(self):
+        for limit in (5, 20):
+            with self.subTest(limit=limit):
+                self.get_list(limit, 5)
+
+    def test_authenticated_list_queries_do_not_depend_on_page_size(self):
+        self.authenticate()
+        for limit in (5, 20):
+            with self.subTest(limit=limit):
+                results = self.get_list(limit, 6)
+        self.assertTrue(any(recipe['is_favorited'] for recipe in results))
+        self.assertTrue(any(recipe['is_in_shopping_cart']
+                            for recipe in results))
+        self.assertTrue(all(len(recipe['ingredients']) == 3
+                            and len(recipe['tags']) == 1
+                            for recipe in results))
+
+    def test_unchanged_page_is_answered_with_not_modified(self):
+        self.authenticate()
+        params = {'limit': 5, 'author': self.authors[1].id}
+        response = self.client.get('/api/recipes/', params)
+        etag = response['ETag']
+        recipe_id = next(recipe['id'] for recipe in response.data['results']
+                         if not recipe['is_favorited'])
+        cache.clear()
+        with self.assertNumQueries(4):
+            response = self.client.get('/api/recipes/', params,
+                                       HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.client.get('/api/recipes/{0}/favorite/'.format(recipe_id))
+        response = self.client.get('/api/recipes/', params,
+                                   HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class RecipeListConditionalTest(RecipeAPITestCase):
+    params = {'limit': 5}
+
+    def get(self, **headers):
+        return self.client.get('/api/recipes/', self.params, **headers)
+
+    def delete_from_page(self, response):
+        Recipe.objects.get(pk=response.data['results'][1]['id']).delete()
+
+    def test_list_has_no_last_modified(self):
+        self.authenticate()
+        response = self.get()
+        self.assertIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+        response = self.get(
+            HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+
+    def test_row_deleted_from_page_gives_new_page(self):
+        self.authenticate()
+        response = self.get()
+        etag = response['ETag']
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.delete_from_page(response)
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_anonymous_conditional_get(self):
+        response = self.get()
+        etag = response['ETag']
+        self.assertNotIn('Last-Modified', response)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.delete_from_page(response)
+        cache.clear()
+        response = self.get(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+
+class RecipeListCountTest(RecipeAPITestCase):
+    def get_count(self, **params):
+        response = self.client.get('/api/recipes/', params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'],
+                         len(response.data['results']))
+        return response.data['count']
+
+    def test_user_scoped_counts_follow_relation_changes(self):
+        self.authenticate()
+        recipes = Recipe.objects.exclude(
+            is_favorited__user=self.user).exclude(
+            customer__user=self.user).order_by('id')[:2]
+        for param, path in (('is_favorited', 'favorite'),
+                            ('is_in_shopping_cart', 'shopping_cart')):
+            with self.subTest(param=param):
+                for cursor in ({}, {'cursor': ''}):
+                    before = self.get_count(**{param: 1, 'limit': 50},
+                                            **cursor)
+                    for recipe in recipes:
+                        self.client.get('/api/recipes/{0}/{1}/'.format(
+                            recipe.id, path))
+                    self.assertEqual(
+                        self.get_count(**{param: 1, 'limit': 50}, **cursor),
+                        before + 2)
+                    for recipe in recipes:
+                        self.client.delete('/api/recipes/{0}/{1}/'.format(
+                            recipe.id, path))
+
+    def test_anonymous_user_scoped_lists_are_empty(self):
+        for param in ('is_favorited', 'is_in_shopping_cart'):
+            with self.subTest(param=param):
+                self.assertEqual(self.get_count(**{param: 1}), 0)
+
+
+class RecipeSearchTest(RecipeAPITestCase):
+    def test_blank_search_does_not_filter(self):
+        for search in ('', '  '):
+            for cursor in ({}, {'cursor': ''}):
+                with self.subTest(search=search, cursor=cursor):
+                    response = self.client.get(
+                        '/api/recipes/', {'search': search, **cursor})
+                    self.assertEqual(response.status_code, 200)
+                    self.assertEqual(response.data['count'], 25)
+
+    def test_search_is_rejected_in_cursor_mode(self):
+        response = self.client.get('/api/recipes/',
+                                   {'search': 'Рецепт', 'cursor': ''})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('search', response.data)
+
+    def test_blank_search_matches_everything_in_queryset(self):
+        self.assertEqual(Recipe.objects.search('   ').count(), 25)
+
+
+class RecipeCreateValidationTest(TestCase):
+    image = ('data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAf'
+             'FcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg==')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(
+            email='author@example.com', username='author',
+            password='password', first_name='Имя', last_name='Фамилия')
+        cls.tag = Tag.objects.create(name='Тег', color='#000000', slug='tag')
+        cls.ingredient = Ingredient.objects.create(name='Ингредиент',
+                                                   measurement_unit='г')
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token {0}'.format(self.token.key))
+
+    def create(self, **data):
+        payload = {
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': self.image,
+            'tags': [self.tag.id],
+            'ingredients': [{'id': self.ingredient.id, 'amount': 5}],
+        }
+        payload.update(data)
+        return self.client.post('/api/recipes/', payload, format='json')
+
+    def test_malformed_tags_are_rejected(self):
+        for tags in (['abc'], [None], [{'id': 1}]):
+            with self.subTest(tags=tags):
+                self.assertEqual(self.create(tags=tags).status_code, 400)
+
+    def test_malformed_ingredients_are_rejected(self):
+        for ingredients in ([{'id': 'abc', 'amount': 1}],
+                            [{'id': self.ingredient.id, 'amount': None}],
+                            [{'amount': 1}], ['abc']):
+            with self.subTest(ingredients=ingredients):
+                response = self.create(ingredients=ingredients)
+                self.assertEqual(response.status_code, 400)
+
+    def test_unknown_tag_is_rejected(self):
+        self.assertEqual(self.create(tags=[self.tag.id + 1]).status_code, 400)
+        self.assertFalse(Recipe.objects.exists())
+
+
+class RecipeWriteQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.customer = create_user('customer')
+        cls.tags = [create_tag('breakfast'), create_tag('dinner')]
+        cls.ingredients = create_ingredients(60)
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.client = get_client(self.author)
+        # Токен попадает в кэш на первом запросе, дальше он не читается.
+        self.client.get('/api/users/me/')
+
+    def get_payload(self, ingredients, tags):
+        return {
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 10,
+            'image': IMAGE,
+            'tags': [tag.id for tag in tags],
+            'ingredients': [{'id': ingredient.id, 'amount': 5}
+                            for ingredient in ingredients],
+        }
+
+    def create_recipe(self, ingredients):
+        recipe = create_recipe(
+            self.author, 'Рецепт', dict.fromkeys(ingredients, 2),
+            self.tags[:1])
+        get_client(self.customer).get(
+            '/api/recipes/{0}/shopping_cart/'.format(recipe.id))
+        return recipe
+
+    def update(self, recipe, ingredients, tags):
+        response = self.client.put(
+            '/api/recipes/{0}/'.format(recipe.id),
+            self.get_payload(ingredients, tags), format='json')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def get_shopping_list(self):
+        return dict(ShoppingListItem.objects.filter(
+            user=self.customer).values_list('ingredient_id', 'amount'))
+
+    def test_create_queries_do_not_depend_on_ingredients(self):
+        for ingredients in (self.ingredients[:1], self.ingredients[:30]):
+            with self.subTest(ingredients=len(ingredients)):
+                with self.assertNumQueries(15):
+                    response = self.client.post(
+                        '/api/recipes/',
+                        self.get_payload(ingredients, self.tags),
+                        format='json')
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual(len(response.data['ingredients']),
+                                 len(ingredients))
+
+    def test_update_queries_do_not_depend_on_ingredients(self):
+        for count in (1, 30):
+            recipe = self.create_recipe(self.ingredients[:count])
+            with self.subTest(ingredients=count):
+                with self.assertNumQueries(21):
+                    self.update(recipe, self.ingredients[:count], self.tags)
+
+    def test_replacing_ingredients_keeps_shopping_list_exact(self):
+        recipe = self.create_recipe(self.ingredients[:30])
+        with self.assertNumQueries(24):
+            response = self.update(recipe, self.ingredients[30:], self.tags)
+        self.assertEqual(
+            {item['id'] for item in response.data['ingredients']},
+            {ingredient.id for ingredient in self.ingredients[30:]})
+        self.assertEqual(self.get_shopping_list(), {
+            ingredient.id: 5 for ingredient in self.ingredients[30:]})
+
+    def test_update_bumps_updated_at_once(self):
+        recipe = self.create_recipe(self.ingredients[:3])
+        updated_at = Recipe.objects.get(pk=recipe.pk).updated_at
+        self.update(recipe, self.ingredients[1:4], self.tags[1:])
+        self.assertGreater(Recipe.objects.get(pk=recipe.pk).updated_at,
+                           updated_at)
@@ -0,0 +1,154 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api_v1 import relations
+from api_v1.models import (CustomUser, FavoriteRecipe, Follow, Ingredient,
+                           IngredientInRecipe, Recipe, ShoppingCart,
+                           ShoppingListItem)
+
+
+class RelationsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author = [
+            CustomUser.objects.create_user(
+                email='{0}@example.com'.format(name), username=name,
+                password='password', first_name='Имя', last_name='Фамилия')
+            for name in ('user', 'author')
+        ]
+        cls.ingredient = Ingredient.objects.create(name='Ингредиент',
+                                                   measurement_unit='г')
+        Recipe.objects.bulk_create([
+            Recipe(author=cls.author, name='Рецепт {0}'.format(number),
+                   text='Описание', cooking_time=10,
+                   image='recipes/recipe.png')
+            for number in range(3)
+        ])
+        cls.recipes = list(Recipe.objects.order_by('id'))
+        IngredientInRecipe.objects.bulk_create([
+            IngredientInRecipe(recipe=recipe, ingredient=cls.ingredient,
+                               amount=10)
+            for recipe in cls.recipes
+        ])
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION='Token {0}'.format(self.token.key))
+        self.ids = [recipe.id for recipe in self.recipes]
+
+    def get_counts(self, field):
+        return list(Recipe.objects.order_by('id').values_list(
+            field, flat=True))
+
+    def get_amount(self):
+        item = ShoppingListItem.objects.filter(user=self.user).first()
+        return item.amount if item else 0
+
+    def test_single_and_batch_favorites_keep_counters_exact(self):
+        self.client.get('/api/recipes/{0}/favorite/'.format(self.ids[0]))
+        response = self.client.post('/api/recipes/favorite/',
+                                    {'ids': self.ids}, format='json')
+        self.assertEqual([item['status'] for item in response.data['results']],
+                         ['exists', 'created', 'created'])
+        self.assertEqual(self.get_counts('favorites_count'), [1, 1, 1])
+        self.client.delete('/api/recipes/{0}/favorite/'.format(self.ids[1]))
+        response = self.client.delete('/api/recipes/favorite/',
+                                      {'ids': self.ids}, format='json')
+        self.assertEqual([item['status'] for item in response.data['results']],
+                         ['deleted', 'not_found', 'deleted'])
+        self.assertEqual(self.get_counts('favorites_count'), [0, 0, 0])
+        self.assertFalse(FavoriteRecipe.objects.exists())
+
+    def test_batch_cart_changes_shopping_list_once(self):
+        self.client.get('/api/recipes/{0}/shopping_cart/'.format(self.ids[0]))
+        self.client.post('/api/recipes/shopping_cart/', {'ids': self.ids},
+                         format='json')
+        self.assertEqual(self.get_amount(), 30)
+        self.assertEqual(self.get_counts('in_carts_count'), [1, 1, 1])
+        self.client.delete('/api/recipes/shopping_cart/',
+                           {'ids': self.ids[:2]}, format='json')
+        self.assertEqual(self.get_amount(), 10)
+        self.assertEqual(self.get_counts('in_carts_count'), [0, 0, 1])
+        self.assertEqual(ShoppingCart.objects.count(), 1)
+
+    def test_batch_unsubscribe_updates_followers_count(self):
+        self.client.get('/api/users/{0}/subscribe/'.format(self.author.id))
+        self.client.delete('/api/users/subscribe/',
+                           {'ids': [self.author.id]}, format='json')
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.followers_count, 0)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_insert_falls_back_to_single_rows_on_conflict(self):
+        self.client.get('/api/recipes/{0}/favorite/'.format(self.ids[0]))
+        created = relations.insert(FavoriteRecipe, self.user, self.ids[:2])
+        self.assertEqual(created, [self.ids[1]])
+        self.assertEqual(self.get_counts('favorites_count'), [1, 1, 0])
+
+    def test_repeated_delete_does_not_decrement_twice(self):
+        self.client.get('/api/recipes/{0}/favorite/'.format(self.ids[0]))
+        self.client.get('/api/recipes/{0}/favorite/'.format(self.ids[1]))
+        FavoriteRecipe.objects.create(user=self.author, recipe=self.recipes[0])
+        self.assertEqual(
+            relations.delete_once(FavoriteRecipe, self.user, self.ids[0]), 1)
+        self.assertEqual(
+            relations.delete_once(FavoriteRecipe, self.user, self.ids[0]), 0)
+        self.assertEqual(self.get_counts('favorites_count'), [1, 1, 0])
+
+
+class RelationToggleQueriesTest(RelationsTest):
+    def setUp(self):
+        super().setUp()
+        # Токен попадает в кэш на первом запросе, дальше он не читается.
+        self.client.get('/api/users/me/')
+
+    def get_statements(self, method, url):
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(url)
+        self.assertLess(response.status_code, 300)
+        # В тестах каждый atomic добавляет SAVEPOINT и RELEASE, в бою их нет.
+        return [query['sql'].split()[0] for query in context.captured_queries
+                if 'SAVEPOINT' not in query['sql']]
+
+    def toggle(self, url):
+        return self.get_statements('get', url), self.get_statements(
+            'delete', url)
+
+    def test_favorite_toggle(self):
+        added, deleted = self.toggle(
+            '/api/recipes/{0}/favorite/'.format(self.ids[0]))
+        # Проверка рецепта и вставка, затем счётчик избранного.
+        self.assertEqual(added, ['SELECT', 'INSERT', 'UPDATE'])
+        self.assertEqual(deleted, ['SELECT', 'DELETE', 'UPDATE'])
+
+    def test_repeated_favorite_is_answered_by_constraint(self):
+        url = '/api/recipes/{0}/favorite/'.format(self.ids[0])
+        self.client.get(url)
+        self.assertEqual(self.get_statements('get', url),
+                         ['SELECT', 'INSERT'])
+        self.assertEqual(self.get_counts('favorites_count'), [1, 0, 0])
+
+    def test_subscribe_toggle(self):
+        added, deleted = self.toggle(
+            '/api/users/{0}/subscribe/'.format(self.author.id))
+        # Автор с подпиской, вставка, счётчик подписчиков, лента
+        # подписчика и последние рецепты автора для ответа.
+        self.assertEqual(added, ['SELECT', 'INSERT', 'UPDATE', 'SELECT',
+                                 'SELECT', 'INSERT', 'SELECT'])
+        self.assertEqual(deleted, ['SELECT', 'DELETE', 'UPDATE', 'DELETE'])
+
+    def test_cart_toggle(self):
+        added, deleted = self.toggle(
+            '/api/recipes/{0}/shopping_cart/'.format(self.ids[0]))
+        # После вставки и счётчика обновляется список покупок.
+        self.assertEqual(added, ['SELECT', 'INSERT', 'UPDATE', 'SELECT',
+                                 'SELECT', 'SELECT', 'INSERT'])
+        self.assertEqual(deleted, ['SELECT', 'DELETE', 'UPDATE', 'SELECT',
+                                   'SELECT', 'SELECT', 'DELETE'])
@@ -0,0 +1,73 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+
+from api_v1.replicas import PIN_COOKIE
+from api_v1.tests.factories import create_recipe, create_user, get_client
+
+
+class ReplicaRoutingTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = create_user('user')
+        self.author = create_user('author')
+        self.client = get_client(self.user)
+        self.client.get('/api/users/me/')
+        # Реплика — отдельный файл SQLite со снимком основной базы, поэтому
+        # всё записанное дальше видно только в основной.
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        path = os.path.join(directory, 'replica.sqlite3')
+        connections['default'].ensure_connection()
+        with sqlite3.connect(path) as replica:
+            connections['default'].connection.backup(replica)
+        connections.databases['replica_1'] = dict(
+            connections['default'].settings_dict, NAME=path)
+        self.addCleanup(self.remove_replica)
+        settings = override_settings(DATABASE_REPLICAS=['replica_1'])
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.recipe = create_recipe(self.author, 'Рецепт')
+
+    def remove_replica(self):
+        connections['replica_1'].close()
+        del connections['replica_1']
+        del connections.databases['replica_1']
+
+    def get_ids(self, client):
+        response = client.get('/api/recipes/')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.get_ids(self.client), [])
+        self.assertEqual(self.get_ids(get_client()), [])
+
+    def test_write_pins_user_to_primary(self):
+        response = self.client.get(
+            '/api/recipes/{0}/favorite/'.format(self.recipe.id))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self.get_ids(self.client), [self.recipe.id])
+        other = get_client(self.author)
+        self.assertEqual(self.get_ids(other), [])
+
+    def test_pin_belongs_to_its_user(self):
+        self.client.get('/api/recipes/{0}/favorite/'.format(self.recipe.id))
+        other = get_client(self.author)
+        other.cookies[PIN_COOKIE] = self.client.cookies[PIN_COOKIE].value
+        self.assertEqual(self.get_ids(other), [])
+
+    def test_forged_pin_is_ignored(self):
+        self.client.cookies[PIN_COOKIE] = str(self.user.pk)
+        self.assertEqual(self.get_ids(self.client), [])
+
+    @override_settings(REPLICA_PIN_SECONDS=-1)
+    def test_expired_pin_is_ignored(self):
+        self.client.get('/api/recipes/{0}/favorite/'.format(self.recipe.id))
+        self.assertEqual(self.get_ids(self.client), [])
@@ -0,0 +1,64 @@
+from django.core.cache import cache
+from django.test import TestCase
+from rest_framework.test import APIRequestFactory
+
+from api_v1.models import FavoriteRecipe, Follow, Ingredient, ShoppingCart, Tag
+from api_v1.serializers import IngredientSerializer, TagSerializer
+
+from .factories import (create_ingredients, create_recipe, create_tag,
+                        create_user, get_client)
+
+
+class ValuesListTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.author = create_user('author')
+        tags = [create_tag('breakfast'), create_tag('dinner')]
+        ingredients = create_ingredients(3)
+        cls.recipes = [
+            create_recipe(cls.author, 'Рецепт {0}'.format(number),
+                          dict.fromkeys(ingredients[number:], number + 1),
+                          tags[number % 2:])
+            for number in range(3)
+        ]
+        FavoriteRecipe.objects.create(user=cls.user, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipes[1])
+        Follow.objects.create(user=cls.user, following=cls.author)
+
+    def setUp(self):
+        cache.clear()
+
+    def assert_list_matches_detail(self, client):
+        response = client.get('/api/recipes/', {'limit': 10})
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(len(results), len(self.recipes))
+        for item in results:
+            detail = client.get('/api/recipes/{0}/'.format(item['id']))
+            self.assertEqual(item, detail.json())
+        return {item['id']: item for item in results}
+
+    def test_recipe_list_matches_detail_for_anonymous(self):
+        self.assert_list_matches_detail(get_client())
+
+    def test_recipe_list_matches_detail_for_user(self):
+        results = self.assert_list_matches_detail(get_client(self.user))
+        first, second, _ = [results[recipe.id] for recipe in self.recipes]
+        self.assertTrue(first['is_favorited'])
+        self.assertTrue(second['is_in_shopping_cart'])
+        self.assertTrue(first['author']['is_subscribed'])
+        self.assertEqual(len(first['ingredients']), 3)
+
+    def test_catalog_lists_match_serializers(self):
+        request = APIRequestFactory().get('/')
+        for url, model, serializer in (
+                ('/api/ingredients/', Ingredient, IngredientSerializer),
+                ('/api/tags/', Tag, TagSerializer)):
+            with self.subTest(url=url):
+                response = get_client().get(url)
+                self.assertEqual(response.status_code, 200)
+                expected = serializer(model.objects.all(), many=True,
+                                      context={'request': request}).data
+                self.assertEqual(response.json(),
+                                 [dict(item) for item in expected])
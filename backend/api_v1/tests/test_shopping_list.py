@@ -0,0 +1,75 @@
+import csv
+import io
+
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.test import TestCase, override_settings
+
+from api_v1.tests.factories import (create_ingredients, create_recipe,
+                                    create_user, get_client)
+
+
+class ShoppingListDownloadTest(TestCase):
+    url = '/api/recipes/download_shopping_cart/'
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('user')
+        flour, sugar = create_ingredients(2)
+        cls.recipes = [
+            create_recipe(cls.user, 'Пирог', {flour: 200, sugar: 50}),
+            create_recipe(cls.user, 'Блины', {flour: 300}),
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = get_client(self.user)
+        for recipe in self.recipes:
+            self.client.get('/api/recipes/{0}/shopping_cart/'.format(
+                recipe.id))
+
+    def download(self, file_format):
+        response = self.client.get(self.url, {'format': file_format})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('shopping_list.{0}'.format(file_format),
+                      response['Content-Disposition'])
+        if response.streaming:
+            return b''.join(response.streaming_content)
+        return response.content
+
+    def test_text_sums_repeated_ingredients(self):
+        self.assertEqual(self.download('txt').decode('utf-8').splitlines(), [
+            'Ингредиент 0 -- 500 г',
+            'Ингредиент 1 -- 50 г',
+        ])
+
+    def test_csv_has_header_and_rows(self):
+        rows = list(csv.reader(io.StringIO(
+            self.download('csv').decode('utf-8'))))
+        self.assertEqual(rows, [
+            ['name', 'amount', 'measurement_unit'],
+            ['Ингредиент 0', '500', 'г'],
+            ['Ингредиент 1', '50', 'г'],
+        ])
+
+    def test_pdf_is_rendered(self):
+        content = self.download('pdf')
+        self.assertTrue(content.startswith(b'%PDF'))
+        self.assertIn(b'DejaVuSans', content)
+
+    @override_settings(SHOPPING_LIST_PDF_FONT='/nonexistent/font.ttf')
+    def test_pdf_requires_cyrillic_font(self):
+        with self.assertRaises(ImproperlyConfigured):
+            self.client.get(self.url, {'format': 'pdf'})
+
+    def test_removed_recipe_leaves_the_list(self):
+        self.client.get('/api/recipes/{0}/shopping_cart/'.format(
+            self.recipes[1].id))
+        self.client.delete('/api/recipes/{0}/shopping_cart/'.format(
+            self.recipes[0].id))
+        self.assertEqual(self.download('txt').decode('utf-8').splitlines(),
+                         ['Ингредиент 0 -- 300 г'])
+        response = self.client.get('/api/recipes/shopping_list/')
+        self.assertEqual([(item['name'], item['amount'])
+                          for item in response.data],
+                         [('Ингредиент 0', 300)])
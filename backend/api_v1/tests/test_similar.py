@@ -0,0 +1,51 @@
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.test import TransactionTestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api_v1.models import CustomUser, Ingredient, SimilarRecipe, Tag
+
+
+class SimilarRecipesUpdateTest(TransactionTestCase):
+    image = ('data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAf'
+             'FcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg==')
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings = override_settings(MEDIA_ROOT=media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        user = CustomUser.objects.create_user(
+            email='author@example.com', username='author',
+            password='password', first_name='Имя', last_name='Фамилия')
+        self.tag = Tag.objects.create(name='Тег', color='#000000', slug='tag')
+        self.ingredients = [
+            Ingredient.objects.create(name='Ингредиент {0}'.format(number),
+                                      measurement_unit='г')
+            for number in range(3)
+        ]
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token {0}'.format(
+            Token.objects.create(user=user).key))
+
+    def test_sequential_creates_update_similar_recipes(self):
+        for number in range(10):
+            response = self.client.post('/api/recipes/', {
+                'name': 'Рецепт {0}'.format(number),
+                'text': 'Описание',
+                'cooking_time': 10,
+                'image': self.image,
+                'tags': [self.tag.id],
+                'ingredients': [
+                    {'id': ingredient.id, 'amount': 1}
+                    for ingredient in self.ingredients[number % 2:][:2]
+                ],
+            }, format='json')
+            self.assertEqual(response.status_code, 201)
+            self.assertTrue(SimilarRecipe.objects.filter(
+                similar=response.data['id']).exists() or number == 0)
@@ -0,0 +1,72 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from api_v1.models import Follow
+
+from .factories import create_recipe, create_user, get_client
+
+
+class SubscriptionsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.authors = [create_user('author{0}'.format(number))
+                       for number in range(4)]
+        for number, author in enumerate(cls.authors):
+            for index in range(number + 2):
+                create_recipe(author, 'Рецепт {0}-{1}'.format(number, index))
+            Follow.objects.create(user=cls.user, following=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = get_client(self.user)
+        self.client.get('/api/users/me/')
+
+    def get_subscriptions(self, **params):
+        return self.client.get('/api/users/subscriptions/', params)
+
+    def test_recipes_limit_bounds_recipes_but_not_recipes_count(self):
+        response = self.get_subscriptions(recipes_limit=2, limit=10)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 4)
+        results = {item['id']: item for item in response.data['results']}
+        for number, author in enumerate(self.authors):
+            item = results[author.id]
+            self.assertTrue(item['is_subscribed'])
+            self.assertEqual(item['recipes_count'], number + 2)
+            self.assertEqual(len(item['recipes']), 2)
+            latest = author.recipes.order_by('-pub_date')[:2]
+            self.assertEqual([recipe['id'] for recipe in item['recipes']],
+                             [recipe.id for recipe in latest])
+
+    def test_without_limit_returns_all_recipes(self):
+        response = self.get_subscriptions(limit=10)
+        for item in response.data['results']:
+            self.assertEqual(len(item['recipes']), item['recipes_count'])
+
+    def test_pagination(self):
+        response = self.get_subscriptions(limit=3, recipes_limit=1)
+        self.assertEqual(response.data['count'], 4)
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertIsNotNone(response.data['next'])
+
+    def test_query_count_does_not_depend_on_authors(self):
+        with CaptureQueriesContext(connection) as small:
+            self.get_subscriptions(limit=1, recipes_limit=1)
+        with CaptureQueriesContext(connection) as large:
+            self.get_subscriptions(limit=4, recipes_limit=1)
+        self.assertEqual(len(small), len(large))
+
+    def test_subscribe_returns_limited_recipes(self):
+        author = create_user('new_author')
+        for number in range(3):
+            create_recipe(author, 'Новый рецепт {0}'.format(number))
+        response = self.client.get(
+            '/api/users/{0}/subscribe/'.format(author.id),
+            {'recipes_limit': 1})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data['recipes']), 1)
+        self.assertEqual(data['recipes_count'], 3)
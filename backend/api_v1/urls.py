@@ -1,16 +1,18 @@
 from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
+from .metrics import metrics_view
 from .views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
 
 router = DefaultRouter()
 
-router.register('users', UserViewSet)
-router.register('tags', TagViewSet)
-router.register('recipes', RecipeViewSet)
-router.register('ingredients', IngredientViewSet, basename='ingredient')
+router.register('users', UserViewSet, basename='users')
+router.register('tags', TagViewSet, basename='tags')
+router.register('recipes', RecipeViewSet, basename='recipes')
+router.register('ingredients', IngredientViewSet, basename='ingredients')
 
 urlpatterns = [
+    path('metrics', metrics_view, name='metrics'),
     path('', include(router.urls)),
     re_path(r'^auth/', include('djoser.urls.base')),
     re_path(r'^auth/', include('djoser.urls.authtoken')),
@@ -1,55 +1,172 @@
-from django.http import HttpResponse, JsonResponse
+import time
+from functools import partial
+
+from django.conf import settings
+from django.db.models import (BooleanField, F, Max, Prefetch, Value,
+                              prefetch_related_objects)
+from django.http import (Http404, HttpResponse, JsonResponse,
+                         StreamingHttpResponse)
+from django.utils.functional import cached_property
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.generics import get_object_or_404
-from rest_framework.pagination import PageNumberPagination
-from rest_framework.permissions import (IsAuthenticated,
+from rest_framework.permissions import (IsAdminUser, IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
+from rest_framework.response import Response
 
+from . import feed, relations
+from .autocomplete import get_index
+from .caching import CATALOG, get_generation, recipe_list_cache
+from .conditional import make_etag, respond_conditionally
+from .fieldsets import get_fieldset
 from .filters import IngredientFilter, RecipeFilter
 from .models import (CustomUser, FavoriteRecipe, Follow, Ingredient,
-                     IngredientInRecipe, Recipe, ShoppingCart, Tag)
-from .paginations import StandardResultsSetPagination
+                     IngredientInRecipe, Recipe, ShoppingCart,
+                     ShoppingListItem, Tag, TagsInRecipe)
+from .paginations import (FeedPagination, RecipePagination,
+                          StandardResultsSetPagination)
+from .renderers import (ShoppingListCSVRenderer, ShoppingListPDFRenderer,
+                        ShoppingListTextRenderer)
+from .replicas import ReplicaReadMixin
+from .representations import (AUTHOR_FIELDS, AUTHOR_OPTIONAL,
+                              INGREDIENT_FIELDS, RECIPE_EXPANDABLE,
+                              RECIPE_FIELDS, TAG_FIELDS, ValuesListMixin,
+                              get_recipe_columns, represent_recipes)
 from .serializers import (CustomUserSerializer, FollowSerializer,
-                          IngredientInRecipeSerializer, IngredientSerializer,
-                          RecipeSerializer, ShortRecipeSerializer,
-                          TagSerializer)
+                          IdListSerializer, IngredientInRecipeSerializer,
+                          IngredientSerializer, RecipeSerializer,
+                          ShortRecipeSerializer, TagSerializer)
+
 
+def change_relations(model, request):
+    serializer = IdListSerializer(data=request.data)
+    serializer.is_valid(raise_exception=True)
+    pks = list(dict.fromkeys(serializer.validated_data['ids']))
+    if request.method == 'POST':
+        results = relations.add(model, request.user, pks)
+    else:
+        results = relations.remove(model, request.user, pks)
+    return Response({'results': results})
 
-class UserViewSet(UserViewSet):
+
+class UserViewSet(ReplicaReadMixin, UserViewSet):
     queryset = CustomUser.objects.all()
     serializer_class = CustomUserSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = StandardResultsSetPagination
+    primary_actions = ('subscribe',)
+
+    @cached_property
+    def fieldset(self):
+        return get_fieldset(self.request, AUTHOR_FIELDS,
+                            optional=AUTHOR_OPTIONAL)
+
+    def is_sparse_action(self):
+        return self.action in ('list', 'retrieve')
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.is_sparse_action() and 'is_subscribed' not in self.fieldset:
+            return queryset
+        return queryset.with_subscription(self.request.user)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.is_sparse_action():
+            context['fieldset'] = self.fieldset
+        return context
+
+    def get_serializer(self, *args, **kwargs):
+        if (args and self.is_sparse_action()
+                and self.fieldset.is_expanded('recipes')):
+            self.prefetch_recipes(args[0] if kwargs.get('many')
+                                  else [args[0]])
+        return super().get_serializer(*args, **kwargs)
+
+    def get_instance(self):
+        return get_object_or_404(self.get_queryset(), pk=self.request.user.pk)
+
+    def get_profile_validators(self):
+        pk = self.kwargs.get('id', self.request.user.pk)
+        try:
+            state = CustomUser.objects.with_subscription(
+                self.request.user
+            ).filter(pk=pk).values_list('updated_at', 'is_subscribed').first()
+        except (TypeError, ValueError):
+            return None
+        if state is None:
+            return None
+        if self.fieldset.is_expanded('recipes'):
+            recipes_updated = Recipe.objects.filter(author=pk).aggregate(
+                updated=Max('updated_at'))['updated']
+            return make_etag(*state, recipes_updated, self.fieldset.key,
+                             self.get_recipes_limit()), max(
+                filter(None, (state[0], recipes_updated)))
+        return make_etag(*state, self.fieldset.key), state[0]
+
+    def retrieve(self, request, *args, **kwargs):
+        return respond_conditionally(
+            request, self.get_profile_validators(),
+            partial(super().retrieve, request, *args, **kwargs))
+
+    def get_recipes_limit(self):
+        try:
+            limit = int(self.request.query_params['recipes_limit'])
+        except (KeyError, ValueError):
+            return None
+        return limit if limit > 0 else None
+
+    def get_subscription_queryset(self):
+        return CustomUser.objects.annotate(
+            is_subscribed=Value(True, output_field=BooleanField()))
 
-    @action(methods=['get', 'delete'], detail=True)
+    def prefetch_recipes(self, authors):
+        prefetch_related_objects(authors, Prefetch(
+            'recipes',
+            queryset=Recipe.objects.latest_per_author(
+                [author.id for author in authors], self.get_recipes_limit())
+        ))
+
+    def get_subscription_data(self, authors, many=False):
+        self.prefetch_recipes(authors)
+        serializer = FollowSerializer(authors, many=True,
+                                      context={'request': self.request})
+        return serializer.data if many else serializer.data[0]
+
+    @action(methods=['get', 'delete'], detail=True,
+            permission_classes=[IsAuthenticated])
     def subscribe(self, request, id=None):
         user = self.request.user
-        following = get_object_or_404(CustomUser, id=id)
-        follow = Follow.objects.filter(user=user, following=following)
-        if request.method == 'GET':
-            if not follow.exists():
-                new_follow = Follow.objects.create(user=user,
-                                                   following=following)
-                new_follow.save()
-            serializer = FollowSerializer(instance=following,
-                                               context={'request': request})
-            return JsonResponse(serializer.data)
-        elif request.method == 'DELETE':
-            follow.delete()
+        if request.method == 'DELETE':
+            try:
+                deleted = relations.delete_once(Follow, user, id)
+            except (TypeError, ValueError):
+                raise Http404
+            if not deleted and not CustomUser.objects.filter(id=id).exists():
+                raise Http404
             return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+        following = get_object_or_404(self.get_subscription_queryset(), id=id)
+        if following.id == user.id:
+            raise ValidationError('Нельзя подписаться на самого себя')
+        relations.create_once(Follow, user, following.id)
+        return JsonResponse(self.get_subscription_data([following]))
+
+    @action(methods=['post', 'delete'], detail=False, url_path='subscribe',
+            url_name='subscribe-batch', permission_classes=[IsAuthenticated])
+    def subscribe_batch(self, request):
+        return change_relations(Follow, request)
 
-    @action(methods=['get'], detail=False, url_path='subscriptions')
+    @action(methods=['get'], detail=False, url_path='subscriptions',
+            permission_classes=[IsAuthenticated])
     def subscriptions(self, request, *args, **kwargs):
-        following = CustomUser.objects.filter(following__user=request.user)
-        paginator = PageNumberPagination()
-        paginator.page_size = 10
-        result_page = paginator.paginate_queryset(following, request)
-        serializer = FollowSerializer(result_page, context={'request': request},
-                                    many=True)
-        return paginator.get_paginated_response(serializer.data)
+        following = self.get_subscription_queryset().filter(
+            following__user=request.user)
+        page = self.paginate_queryset(following)
+        return self.get_paginated_response(
+            self.get_subscription_data(page, many=True))
 
 
 class IngredientInRecipeViewSet(viewsets.ModelViewSet):
@@ -58,14 +175,124 @@ class IngredientInRecipeViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, ValuesListMixin,
+                    viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     permission_classes = (IsAuthenticatedOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filter_class = RecipeFilter
     filterset_fields = ['author', 'is_favorited', 'is_in_shopping_cart', 'tags']
-    pagination_class = StandardResultsSetPagination
+    pagination_class = RecipePagination
+    primary_actions = ('favorite', 'shopping_cart')
+
+    @cached_property
+    def fieldset(self):
+        return get_fieldset(self.request, RECIPE_FIELDS, RECIPE_EXPANDABLE)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in ('retrieve', 'feed'):
+            context['fieldset'] = self.fieldset
+        return context
+
+    def get_values(self, queryset):
+        if self.fieldset.includes_any('is_favorited', 'is_in_shopping_cart'):
+            queryset = queryset.with_user_flags(self.request.user)
+        columns = ['updated_at']
+        if self.fieldset.is_expanded('author'):
+            columns.append('author__updated_at')
+        return queryset.values(*get_recipe_columns(self.fieldset), *columns)
+
+    def represent(self, rows):
+        return represent_recipes(rows, self.request, self.fieldset)
+
+    def get_cached_list(self, request, *args, **kwargs):
+        start = time.perf_counter()
+        key, data = recipe_list_cache.get(request)
+        if data is not None:
+            return Response(data, headers={'X-Cache': 'HIT'})
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            recipe_list_cache.set(key, response.data, start)
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def get_page_validators(self, page):
+        # Last-Modified у страницы не ставится: когда строка уходит со
+        # страницы, время изменения оставшихся не меняется. Состав страницы
+        # и общее количество учитывает только ETag, как и у анонимов.
+        state = [(row['id'], row['updated_at'], row.get('author__updated_at'))
+                 for row in page]
+        return make_etag(
+            self.request.get_full_path(), self.request.user.pk,
+            get_generation(CATALOG), self.paginator.get_count(), state
+        ), None
+
+    def respond_page(self, page):
+        if self.request.user.is_anonymous:
+            return super().respond_page(page)
+        return respond_conditionally(
+            self.request, self.get_page_validators(page),
+            partial(super().respond_page, page))
+
+    def get_recipe_validators(self):
+        try:
+            state = Recipe.objects.filter(
+                pk=self.kwargs['pk']
+            ).with_user_flags(self.request.user).with_author_subscription(
+                self.request.user
+            ).values_list('updated_at', 'author__updated_at', 'favorited',
+                          'in_shopping_cart', 'is_subscribed').first()
+        except (TypeError, ValueError):
+            return None
+        if state is None:
+            return None
+        return make_etag(get_generation(CATALOG), self.fieldset.key,
+                         *state), max(state[:2])
+
+    def list(self, request, *args, **kwargs):
+        if not request.user.is_anonymous:
+            return super().list(request, *args, **kwargs)
+        response = self.get_cached_list(request, *args, **kwargs)
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        return respond_conditionally(
+            request, (make_etag(response.data), None), lambda: response)
+
+    def retrieve(self, request, *args, **kwargs):
+        return respond_conditionally(
+            request, self.get_recipe_validators(),
+            partial(super().retrieve, request, *args, **kwargs))
+
+    @action(detail=False, permission_classes=[IsAdminUser])
+    def cache_stats(self, request):
+        return Response(recipe_list_cache.stats())
+
+    def get_related_queryset(self):
+        user, fieldset = self.request.user, self.fieldset
+        queryset = Recipe.objects.all()
+        if fieldset.includes_any('is_favorited', 'is_in_shopping_cart'):
+            queryset = queryset.with_user_flags(user)
+        if fieldset.is_expanded('author'):
+            queryset = queryset.prefetch_related(Prefetch(
+                'author', queryset=CustomUser.objects.with_subscription(user)))
+        for name, model, related in (('ingredients', IngredientInRecipe,
+                                      'ingredient'),
+                                     ('tags', TagsInRecipe, 'tag')):
+            if name not in fieldset:
+                continue
+            rows = model.objects.order_by('id')
+            if fieldset.is_expanded(name):
+                rows = rows.select_related(related)
+            queryset = queryset.prefetch_related(Prefetch(name,
+                                                          queryset=rows))
+        return queryset
+
+    def get_queryset(self):
+        if self.action in ('retrieve', 'feed'):
+            return self.get_related_queryset()
+        return Recipe.objects.all()
 
     def perform_create(self, serializer):
         serializer.save(
@@ -80,78 +307,143 @@ class RecipeViewSet(viewsets.ModelViewSet):
             tags=self.request.data['tags']
         )
 
+    def add_relation(self, model, pk):
+        recipe = get_object_or_404(
+            Recipe.objects.only('id', 'name', 'image', 'image_variants_status',
+                                'cooking_time'), id=pk)
+        relations.create_once(model, self.request.user, recipe.id)
+        serializer = ShortRecipeSerializer(instance=recipe,
+                                           context={'request': self.request})
+        return JsonResponse(serializer.data)
+
+    def delete_relation(self, model, pk):
+        try:
+            deleted = relations.delete_once(model, self.request.user, pk)
+        except (TypeError, ValueError):
+            raise Http404
+        if not deleted and not Recipe.objects.filter(id=pk).exists():
+            raise Http404
+        return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def feed(self, request):
+        paginator = FeedPagination()
+        page = paginator.paginate_feed(self.get_queryset(),
+                                       feed.get_sources(request.user),
+                                       request)
+        serializer = self.get_serializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+    @action(detail=True)
+    def similar(self, request, pk=None):
+        try:
+            limit = max(1, min(int(request.query_params['limit']),
+                               settings.SIMILAR_RECIPES_COUNT))
+        except (KeyError, ValueError):
+            limit = settings.SIMILAR_RECIPES_COUNT
+        try:
+            recipes = list(Recipe.objects.filter(
+                similar_to__recipe=pk
+            ).order_by('-similar_to__score')[:limit])
+        except (TypeError, ValueError):
+            raise Http404
+        if not recipes and not Recipe.objects.filter(id=pk).exists():
+            raise Http404
+        serializer = ShortRecipeSerializer(recipes, many=True,
+                                           context={'request': request})
+        return Response(serializer.data)
+
     @action(methods=['get', 'delete'], detail=True,
             permission_classes=[IsAuthenticated])
     def favorite(self, request, pk=None):
-        user = self.request.user
-        recipe = get_object_or_404(Recipe, id=pk)
-        favorite = FavoriteRecipe.objects.filter(user=user, recipe=recipe)
         if request.method == 'GET':
-            if not favorite.exists():
-                new_favorite = FavoriteRecipe.objects.create(user=user,
-                                                              recipe=recipe)
-                new_favorite.save()
-            serializer = ShortRecipeSerializer(instance=recipe,
-                                          context={'request': request})
-            return JsonResponse(serializer.data)
-        elif request.method == 'DELETE':
-            favorite.delete()
-            return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+            return self.add_relation(FavoriteRecipe, pk)
+        return self.delete_relation(FavoriteRecipe, pk)
+
+    @action(methods=['post', 'delete'], detail=False, url_path='favorite',
+            url_name='favorite-batch', permission_classes=[IsAuthenticated])
+    def favorite_batch(self, request):
+        return change_relations(FavoriteRecipe, request)
 
     @action(methods=['get', 'delete'], detail=True,
-            permission_classes=[IsAuthenticatedOrReadOnly])
+            permission_classes=[IsAuthenticated])
     def shopping_cart(self, request, pk=None):
-        user = self.request.user
-        recipe = get_object_or_404(Recipe, id=pk)
-        shopping_cart = ShoppingCart.objects.filter(user=user, recipe=recipe)
         if request.method == 'GET':
-            if not shopping_cart.exists():
-                is_in_shopping_cart = ShoppingCart.objects.create(user=user,
-                                                              recipe=recipe)
-                is_in_shopping_cart.save()
-            serializer = ShortRecipeSerializer(instance=recipe,
-                                          context={'request': request})
-            return JsonResponse(serializer.data)
-        elif request.method == 'DELETE':
-            shopping_cart.delete()
-            return HttpResponse(status=status.HTTP_204_NO_CONTENT)
+            return self.add_relation(ShoppingCart, pk)
+        return self.delete_relation(ShoppingCart, pk)
+
+    @action(methods=['post', 'delete'], detail=False,
+            url_path='shopping_cart', url_name='shopping-cart-batch',
+            permission_classes=[IsAuthenticated])
+    def shopping_cart_batch(self, request):
+        return change_relations(ShoppingCart, request)
+
+    def get_shopping_list(self):
+        return ShoppingListItem.objects.filter(
+            user=self.request.user
+        ).values(
+            'amount',
+            name=F('ingredient__name'),
+            measurement_unit=F('ingredient__measurement_unit')
+        ).order_by('name')
+
+    @action(detail=False, permission_classes=[IsAuthenticated])
+    def shopping_list(self, request):
+        return Response(list(self.get_shopping_list().values(
+            'amount', 'name', 'measurement_unit', id=F('ingredient'))))
 
     @action(detail=False,
-            permission_classes=[IsAuthenticatedOrReadOnly])
+            permission_classes=[IsAuthenticated],
+            renderer_classes=[ShoppingListTextRenderer,
+                              ShoppingListCSVRenderer,
+                              ShoppingListPDFRenderer])
     def download_shopping_cart(self, request, pk=None):
-        filename = 'shopping_list.txt'
-        recipes = Recipe.objects.filter(customer__user=request.user)
-        ingredients = {}
-        for recipe in recipes:
-            ing_in_recipe = IngredientInRecipe.objects.filter(recipe=recipe)
-            for ing in ing_in_recipe:
-                if ing in ingredients:
-                    ingredients[ing.ingredient.name] += ing.amount
-                else:
-                    ingredients[ing.ingredient.name] = (ing.amount,
-                                            ing.ingredient.measurement_unit)
-        content = ''
-        for ingredient, amount in ingredients.items():
-            nl = '\n'
-            content += f'{ingredient} -- {amount[0]} {amount[1]}{nl}'
-        response = HttpResponse(content, content_type='text/plain')
+        renderer = request.accepted_renderer
+        filename = 'shopping_list.{0}'.format(renderer.format)
+        ingredients = self.get_shopping_list()
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = '{0}; charset={1}'.format(content_type,
+                                                     renderer.charset)
+        content = renderer.stream(ingredients.iterator())
+        if renderer.streaming:
+            response = StreamingHttpResponse(content,
+                                             content_type=content_type)
+        else:
+            response = HttpResponse(b''.join(content),
+                                    content_type=content_type)
         response['Content-Disposition'] = 'attachment; filename={0}'.format(
             filename)
         return response
 
 
-class IngredientViewSet(viewsets.ModelViewSet):
+class IngredientViewSet(ReplicaReadMixin, ValuesListMixin,
+                        viewsets.ModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
+    values_fields = INGREDIENT_FIELDS
     permission_classes = (IsAuthenticatedOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filter_class = IngredientFilter
     filterset_fields = ['name', ]
     pagination_class = None
+    autocomplete_limit = 10
+    autocomplete_max_limit = 50
+
+    @action(detail=False)
+    def autocomplete(self, request):
+        try:
+            limit = min(int(request.query_params['limit']),
+                        self.autocomplete_max_limit)
+        except (KeyError, ValueError):
+            limit = self.autocomplete_limit
+        name = request.query_params.get('name', '')
+        return Response(get_index().search(name, limit))
 
 
-class TagViewSet(viewsets.ModelViewSet):
+class TagViewSet(ReplicaReadMixin, ValuesListMixin, viewsets.ModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
+    values_fields = TAG_FIELDS
     permission_classes = (IsAuthenticatedOrReadOnly,)
     pagination_class = None
@@ -20,12 +20,14 @@ INSTALLED_APPS = [
     'rest_framework',
     'rest_framework.authtoken',
     'django_filters',
-    'api_v1',
+    'api_v1.app.ApiV1Config',
     'colorfield',
     # 'django_extensions',
 ]
 
 MIDDLEWARE = [
+    'api_v1.metrics.MetricsMiddleware',
+    'api_v1.replicas.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -68,7 +70,7 @@ DATABASES = {
     # }
 
     'default': {
-        'ENGINE': 'django.db.backends.postgresql',
+        'ENGINE': os.environ.get('DB_ENGINE', 'django.db.backends.postgresql'),
         'NAME': os.environ.get('DB_NAME'),
         'USER': os.environ.get('POSTGRES_USER'),
         'PASSWORD': os.environ.get('POSTGRES_PASSWORD'),
@@ -77,6 +79,20 @@ DATABASES = {
     }
 }
 
+DATABASE_REPLICAS = []
+
+for number, replica in enumerate(
+        filter(None, os.environ.get('DB_REPLICAS', '').split(',')), 1):
+    alias = 'replica_{0}'.format(number)
+    location = 'NAME' if 'sqlite' in DATABASES['default']['ENGINE'] else 'HOST'
+    DATABASES[alias] = dict(DATABASES['default'], TEST={'MIRROR': 'default'},
+                            **{location: replica.strip()})
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['api_v1.replicas.ReplicaRouter']
+
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 5))
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.'
@@ -116,7 +132,7 @@ MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api_v1.authentication.CachedTokenAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -140,6 +156,54 @@ EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 DEFAULT_FROM_EMAIL = f'admin@{DOMAIN_NAME}'
 
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', 'foodgram'),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CACHE_MAX_ENTRIES', 10000)),
+        },
+    }
+}
+
+AUTH_TOKEN_CACHE_TIMEOUT = 300
+
+AUTH_TOKEN_LOCAL_CACHE_TIMEOUT = 5
+
+RECIPES_COUNT_CACHE_TIMEOUT = 60
+
+RECIPES_LIST_CACHE_TIMEOUT = 300
+
+INGREDIENT_INDEX_TIMEOUT = 60
+
+INGREDIENT_INDEX_CHECK_SECONDS = 5
+
+RECIPE_IMAGE_MAX_BYTES = 10 * 1024 * 1024
+
+RECIPE_IMAGE_MAX_DIMENSION = 8000
+
+RECIPE_IMAGE_WORKERS = int(os.getenv('RECIPE_IMAGE_WORKERS', 2))
+
+SIMILAR_RECIPES_COUNT = 10
+
+SIMILAR_RECIPES_MAX_SHARE = 0.05
+
+SIMILAR_RECIPES_TAG_WEIGHT = 0.3
+
+FEED_FANOUT_LIMIT = 10000
+
+FEED_BACKFILL_SIZE = 50
+
+RELATIONS_BATCH_MAX_SIZE = 100
+
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf'
+)
+
 DJOSER = {
     "LOGIN_FIELD": "email",
     'HIDE_USERS': False,